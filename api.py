@@ -0,0 +1,287 @@
+import argparse
+import json
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from urllib.parse import parse_qs, unquote, urlsplit
+
+import db
+import folio
+import instrument
+import migrations
+from billing_core import BillingEngine
+from bookings import RoomBookings, UnknownBooking
+from db import DB_FILE
+from journal import OrderJournal, read_events
+from rooms import RoomCatalog
+
+HOST = '127.0.0.1'
+PORT = 8765
+WORKERS = 32
+API_JOURNAL_FILE = 'api_orders.journal'
+MAX_BODY = 64 * 1024
+
+
+class NotFound(Exception):
+    pass
+
+
+# The operations of the billing and room windows for HTTP clients (tablets,
+# kiosk). RoomBookings locks its own index; BillingEngine is guarded by
+# billing_lock here. The database work underneath goes through the shared
+# connection pool in db.py. Open orders are not shared with the billing
+# window: the API serves only tables assigned to it, with their orders in
+# its own journal. New tables are added for it with
+# `python tables.py add LABEL ZONE api`.
+class HotelService:
+    def __init__(self, path=DB_FILE, journal_path=API_JOURNAL_FILE):
+        self.path = path
+        self.catalog = RoomCatalog(path)
+        self.bookings = RoomBookings(self.catalog, path)
+        self.engine = BillingEngine(path, journal=OrderJournal(journal_path), front_end='api')
+        self.engine.recover(read_events(journal_path))
+        self.billing_lock = threading.Lock()
+
+    def close(self):
+        self.engine.journal.close()
+        db.close_pool(self.path)
+
+    # Rooms
+
+    def rooms(self):
+        self.catalog.ensure_fresh()
+        occupied = self.bookings.current_occupants()
+        rooms = []
+        for room_no in self.catalog:
+            occupant = occupied.get(room_no)
+            rooms.append(dict(self.catalog.get(room_no)._asdict(), occupant=occupant[0] if occupant else None))
+        return rooms
+
+    def free_rooms(self, checkin, checkout):
+        return self.bookings.free_rooms(checkin, checkout)
+
+    def add_occupant(self, body):
+        return {'id': self.bookings.add_occupant(*occupant_fields(body))}
+
+    def edit_occupant(self, occ_id, body):
+        try:
+            self.bookings.edit_occupant(occ_id, *occupant_fields(body))
+        except UnknownBooking as e:
+            raise NotFound(str(e))
+        return {'id': int(occ_id)}
+
+    def early_checkout(self, occ_id):
+        room_no = self.bookings.early_checkout(occ_id)
+        if room_no is None:
+            raise NotFound(f"No booking with id {occ_id}")
+        return {'id': int(occ_id), 'room_no': room_no, 'folio': self.folio(occ_id)}
+
+    def folio(self, occ_id):
+        stay = folio.get(occ_id, self.path)
+        if stay is None:
+            raise NotFound(f"No folio for occupant {occ_id}")
+        return dict(stay._asdict(), restaurant_bills=[
+            {'bill_number': n, 'date': d, 'table': t, 'total': total}
+            for n, d, t, total in folio.bills_for(occ_id, self.path)])
+
+    def guest(self, contact):
+        guest = self.bookings.guests.lookup(contact)
+        if guest is None:
+            raise NotFound(f"No guest with contact {contact}")
+        return guest._asdict()
+
+    # Menu
+
+    def menu(self, prefix):
+        with self.billing_lock:
+            self.engine.menu.ensure_fresh()
+            return [item._asdict() for item in self.engine.menu.complete(prefix)]
+
+    # Tables
+
+    def check_table(self, label):
+        if label not in self.engine.layout:
+            raise NotFound(f"Table {label} is not served by the API")
+
+    def table(self, label):
+        self.check_table(label)
+        with self.billing_lock:
+            return session_json(self.engine.get_table(label))
+
+    def generate_bill(self, label, body):
+        self.check_table(label)
+        with self.billing_lock:
+            return session_json(self.engine.generate_bill(label, body.get('name', ''),
+                                                          body.get('contact', '')))
+
+    def add_item(self, label, body):
+        self.check_table(label)
+        with self.billing_lock:
+            data = self.engine.get_table(label)
+            if not data.customer_name:
+                raise ValueError("Please generate bill first!")
+            self.engine.add_item(label, body.get('item', ''), body.get('qty', ''), body.get('cost', ''))
+            return session_json(data)
+
+    def charge_to_room(self, label, body):
+        self.check_table(label)
+        with self.billing_lock:
+            return session_json(self.engine.charge_to_room(label, body.get('room_no', '')))
+
+    def save_bill(self, label):
+        self.check_table(label)
+        with self.billing_lock:
+            data = self.engine.get_table(label)
+            result = self.engine.save_bill(label)
+        return {'bill_number': data.bill_no, 'total': data.grand_total, 'items': result.rows}
+
+
+def occupant_fields(body):
+    return tuple(str(body.get(key, '')) for key in
+                 ('room_no', 'name', 'contact', 'address', 'gender', 'checkin', 'checkout'))
+
+
+def session_json(data):
+    return {
+        'table': data.table_num,
+        'bill_number': data.bill_no,
+        'customer_name': data.customer_name,
+        'customer_contact': data.customer_contact,
+        'room_no': data.room_no,
+        'items': [dict(zip(('item', 'qty', 'cost', 'total'), line)) for line in data.items_list],
+        'total': data.grand_total,
+    }
+
+
+# (method, path pattern, handler(service, match, query, body))
+ROUTES = [
+    ('GET', r'/health', lambda s, m, q, b: {'ok': True}),
+    ('GET', r'/rooms', lambda s, m, q, b: s.rooms()),
+    ('GET', r'/rooms/free', lambda s, m, q, b: s.free_rooms(q.get('checkin', ''), q.get('checkout', ''))),
+    ('POST', r'/occupants', lambda s, m, q, b: s.add_occupant(b)),
+    ('PUT', r'/occupants/(\d+)', lambda s, m, q, b: s.edit_occupant(m[1], b)),
+    ('POST', r'/occupants/(\d+)/checkout', lambda s, m, q, b: s.early_checkout(m[1])),
+    ('GET', r'/occupants/(\d+)/folio', lambda s, m, q, b: s.folio(m[1])),
+    ('GET', r'/guests/([^/]+)', lambda s, m, q, b: s.guest(unquote(m[1]))),
+    ('GET', r'/menu', lambda s, m, q, b: s.menu(q.get('prefix', ''))),
+    ('GET', r'/tables/([^/]+)', lambda s, m, q, b: s.table(m[1])),
+    ('POST', r'/tables/([^/]+)/bill', lambda s, m, q, b: s.generate_bill(m[1], b)),
+    ('POST', r'/tables/([^/]+)/items', lambda s, m, q, b: s.add_item(m[1], b)),
+    ('POST', r'/tables/([^/]+)/room', lambda s, m, q, b: s.charge_to_room(m[1], b)),
+    ('POST', r'/tables/([^/]+)/save', lambda s, m, q, b: s.save_bill(m[1])),
+]
+ROUTES = [(method, re.compile(pattern + '$'), handler) for method, pattern, handler in ROUTES]
+
+
+class Handler(BaseHTTPRequestHandler):
+    # Keep-alive, so a tablet reuses one connection for its requests.
+    protocol_version = 'HTTP/1.1'
+    # Headers and body go out as separate writes; without TCP_NODELAY the
+    # body waits on the client's delayed ACK (~40 ms per request).
+    disable_nagle_algorithm = True
+    # Idle keep-alive connections give their worker back after this long.
+    timeout = 5
+    quiet = True
+
+    def do_GET(self):
+        self.dispatch()
+
+    def do_POST(self):
+        self.dispatch()
+
+    def do_PUT(self):
+        self.dispatch()
+
+    def dispatch(self):
+        url = urlsplit(self.path)
+        try:
+            body = self.read_body()
+            for method, pattern, handler in ROUTES:
+                match = pattern.match(url.path)
+                if match and method == self.command:
+                    query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+                    self.reply(201 if method == 'POST' and url.path == '/occupants' else 200,
+                               handler(self.server.service, match, query, body))
+                    return
+            raise NotFound(f"No route for {self.command} {url.path}")
+        except NotFound as e:
+            self.reply(404, {'error': str(e)})
+        except ValueError as e:
+            self.reply(400, {'error': str(e)})
+        except Exception as e:
+            self.reply(500, {'error': f"{type(e).__name__}: {e}"})
+
+    def read_body(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        if length > MAX_BODY:
+            raise ValueError("Request body too large!")
+        if not length:
+            return {}
+        body = json.loads(self.rfile.read(length))
+        if not isinstance(body, dict):
+            raise ValueError("Request body must be a JSON object!")
+        return body
+
+    def reply(self, status, payload):
+        data = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        if not self.quiet:
+            super().log_message(format, *args)
+
+
+# HTTPServer that hands each connection to a fixed pool of worker threads
+# instead of starting a thread per connection.
+class PooledHTTPServer(HTTPServer):
+    request_queue_size = 256
+    def __init__(self, address, service, workers=WORKERS):
+        super().__init__(address, Handler)
+        self.service = service
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='api')
+
+    def process_request(self, request, client_address):
+        self.executor.submit(self.process_request_thread, request, client_address)
+
+    def process_request_thread(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def server_close(self):
+        super().server_close()
+        self.executor.shutdown(wait=True)
+
+
+def serve(host=HOST, port=PORT, path=DB_FILE, workers=WORKERS, journal_path=API_JOURNAL_FILE):
+    migrations.migrate(path)
+    return PooledHTTPServer((host, port), HotelService(path, journal_path), workers)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local HTTP/JSON API for billing and room booking")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--workers", type=int, default=WORKERS)
+    parser.add_argument("--verbose", action="store_true", help="log every request")
+    args = parser.parse_args()
+
+    Handler.quiet = not args.verbose
+    instrument.setup_logging()
+    server = serve(args.host, args.port, workers=args.workers)
+    print(f"Serving on http://{args.host}:{server.server_port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        server.service.close()
@@ -0,0 +1,233 @@
+import argparse
+import os
+import re
+import sys
+from contextlib import contextmanager
+from datetime import date
+
+import bookings
+import db
+import migrations
+import reports
+from db import DB_FILE
+from records import BILL_COLUMNS, bill_filters
+
+ARCHIVE_DIR = 'archive'
+KEEP_MONTHS = 12
+ATTEMPTS = 3
+MONTH_FILE = re.compile(r"bills_(\d{4})_(\d{2})\.db$")
+
+# Copied by name, so a column added to the hot tables later only needs
+# adding here and to ARCHIVE_SCHEMA. Archived bills keep their ids, menu
+# item ids and guest and folio links.
+ARCHIVE_BILL_COLUMNS = ("id, bill_number, table_number, customer_name, customer_contact, date, total_cost, "
+                        "guest_id, occupant_id")
+ARCHIVE_ITEM_COLUMNS = "id, bill_id, item_name, item_quantity, cost_per_item, total_cost, menu_item_id"
+
+# Columns added since the first archive files were written: (table, column, type).
+ADDED_COLUMNS = (
+    ('bills', 'guest_id', 'INTEGER'),
+    ('bills', 'occupant_id', 'INTEGER'),
+)
+
+ARCHIVE_SCHEMA = (
+    """CREATE TABLE IF NOT EXISTS {alias}.bills (
+        id INTEGER PRIMARY KEY,
+        bill_number INTEGER,
+        table_number TEXT,
+        customer_name TEXT,
+        customer_contact TEXT,
+        date TEXT,
+        total_cost REAL,
+        guest_id INTEGER,
+        occupant_id INTEGER
+    )""",
+    """CREATE TABLE IF NOT EXISTS {alias}.bill_items (
+        id INTEGER PRIMARY KEY,
+        bill_id INTEGER NOT NULL,
+        item_name TEXT,
+        item_quantity INTEGER,
+        cost_per_item REAL,
+        total_cost REAL,
+        menu_item_id INTEGER
+    )""",
+    "CREATE INDEX IF NOT EXISTS {alias}.idx_bills_date ON bills(date)",
+    "CREATE INDEX IF NOT EXISTS {alias}.idx_bills_customer ON bills(customer_name)",
+    "CREATE INDEX IF NOT EXISTS {alias}.idx_bill_items_bill ON bill_items(bill_id)",
+)
+
+# Bills of one month that are not in the archive yet.
+UNCOPIED_SQL = """SELECT 1 FROM main.bills
+    WHERE date BETWEEN ? AND ? AND id NOT IN (SELECT id FROM arc.bills) LIMIT 1"""
+
+
+def month_path(year, month, archive_dir=ARCHIVE_DIR):
+    return os.path.join(archive_dir, f"bills_{year:04d}_{month:02d}.db")
+
+
+def month_bounds(year, month):
+    return f"{year:04d}-{month:02d}-01", f"{year:04d}-{month:02d}-31"
+
+
+def add_months(year, month, count):
+    year, month = divmod(year * 12 + month - 1 + count, 12)
+    return year, month + 1
+
+
+# [(year, month)] of the archive files present, oldest first.
+def archived_months(archive_dir=ARCHIVE_DIR):
+    if not os.path.isdir(archive_dir):
+        return []
+    found = (MONTH_FILE.match(name) for name in os.listdir(archive_dir))
+    return sorted((int(m[1]), int(m[2])) for m in found if m)
+
+
+# Attaches one month's archive to a pooled connection as `alias` for the
+# duration of the block. The month file is created if missing.
+@contextmanager
+def attached(conn, year, month, alias='arc', archive_dir=ARCHIVE_DIR):
+    os.makedirs(archive_dir, exist_ok=True)
+    conn.execute(f"ATTACH DATABASE ? AS {alias}", (month_path(year, month, archive_dir),))
+    try:
+        for sql in ARCHIVE_SCHEMA:
+            conn.execute(sql.format(alias=alias))
+        for table, column, kind in ADDED_COLUMNS:
+            if column not in [info[1] for info in conn.execute(f"PRAGMA {alias}.table_info({table})")]:
+                conn.execute(f"ALTER TABLE {alias}.{table} ADD COLUMN {column} {kind}")
+        yield conn
+    finally:
+        if conn.in_transaction:
+            conn.rollback()
+        conn.execute(f"DETACH DATABASE {alias}")
+
+
+# [(year, month)] holding hot bills older than keep_months before today.
+def months_due(keep_months=KEEP_MONTHS, path=DB_FILE, today=None):
+    today = today or date.today()
+    cutoff = "%04d-%02d-01" % add_months(today.year, today.month, -keep_months)
+    with db.connection(path) as conn:
+        rows = conn.execute("""SELECT DISTINCT substr(date, 1, 7) FROM bills
+            WHERE date < ? AND date GLOB '[0-9][0-9][0-9][0-9]-[0-9][0-9]-*'
+            ORDER BY 1""", (cutoff,)).fetchall()
+    return [(int(row[0][:4]), int(row[0][5:])) for row in rows]
+
+
+# Moves one month of bills and their line items into its archive file.
+# The copy is committed before anything is deleted, and only bills found in
+# the archive are deleted, so an interrupted run loses nothing and is safe
+# to repeat. The month's daily rollups stay in the hot database, which is
+# what keeps reports over archived months cheap. Returns bills moved.
+def archive_month(year, month, path=DB_FILE, archive_dir=ARCHIVE_DIR):
+    start, end = month_bounds(year, month)
+    with db.connection(path) as conn, attached(conn, year, month, archive_dir=archive_dir):
+        for _ in range(ATTEMPTS):
+            reports.refresh_rollups(path)
+            conn.execute(f"""INSERT OR IGNORE INTO arc.bills ({ARCHIVE_BILL_COLUMNS})
+                SELECT {ARCHIVE_BILL_COLUMNS} FROM main.bills WHERE date BETWEEN ? AND ?""", (start, end))
+            conn.execute(f"""INSERT OR IGNORE INTO arc.bill_items ({ARCHIVE_ITEM_COLUMNS})
+                SELECT {ARCHIVE_ITEM_COLUMNS} FROM main.bill_items
+                WHERE bill_id IN (SELECT id FROM main.bills WHERE date BETWEEN ? AND ?)""", (start, end))
+            conn.commit()
+
+            conn.execute("BEGIN IMMEDIATE")
+            # A bill written for this month since the copy: copy again.
+            if (conn.execute(UNCOPIED_SQL, (start, end)).fetchone() or conn.execute(
+                    "SELECT 1 FROM rollup_dirty WHERE date BETWEEN ? AND ? LIMIT 1", (start, end)).fetchone()):
+                conn.rollback()
+                continue
+            conn.execute("""DELETE FROM main.bill_items WHERE bill_id IN
+                (SELECT id FROM main.bills WHERE date BETWEEN ? AND ?)""", (start, end))
+            moved = conn.execute("DELETE FROM main.bills WHERE date BETWEEN ? AND ?", (start, end)).rowcount
+            # The delete trigger marked these days dirty, but their rollups
+            # are already complete and must not be rebuilt from empty tables.
+            conn.execute("DELETE FROM rollup_dirty WHERE date BETWEEN ? AND ?", (start, end))
+            conn.commit()
+            return moved
+    raise RuntimeError(f"Bills for {year:04d}-{month:02d} kept changing; archive again later.")
+
+
+# The retention job: finished stays go to stay_history and bills older
+# than keep_months go to per-month archive files. Returns
+# (stays moved, {(year, month): bills moved}).
+def run_retention(keep_months=KEEP_MONTHS, path=DB_FILE, archive_dir=ARCHIVE_DIR, today=None):
+    stays = bookings.archive_completed_stays(today, path)
+    months = {}
+    for year, month in months_due(keep_months, path, today):
+        months[(year, month)] = archive_month(year, month, path, archive_dir)
+    return stays, months
+
+
+# Archived bills matching the records window filters, newest month first.
+# Only the month files overlapping the date range are attached.
+def search_bills(date_from=None, date_to=None, table=None, customer=None, path=DB_FILE,
+                 archive_dir=ARCHIVE_DIR):
+    clauses, params = bill_filters(date_from, date_to, table, customer)
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+    for year, month in reversed(archived_months(archive_dir)):
+        start, end = month_bounds(year, month)
+        if (date_from and end < date_from) or (date_to and start > date_to):
+            continue
+        with db.connection(path) as conn, attached(conn, year, month, archive_dir=archive_dir):
+            rows = conn.execute(f"SELECT {BILL_COLUMNS} FROM arc.bills {where} ORDER BY id DESC",
+                                params).fetchall()
+        yield from rows
+
+
+def fetch_archived_items(bill_id, bill_date, path=DB_FILE, archive_dir=ARCHIVE_DIR):
+    year, month = int(bill_date[:4]), int(bill_date[5:7])
+    if not os.path.exists(month_path(year, month, archive_dir)):
+        return []
+    with db.connection(path) as conn, attached(conn, year, month, archive_dir=archive_dir):
+        return conn.execute("""SELECT item_name, item_quantity, cost_per_item, total_cost
+            FROM arc.bill_items WHERE bill_id = ? ORDER BY id""", (bill_id,)).fetchall()
+
+
+# Past stays by guest name prefix, contact number or room, newest first.
+def search_stays(name=None, contact=None, room_no=None, path=DB_FILE, limit=200):
+    clauses, params = [], []
+    if name:
+        clauses.append("name LIKE ?")
+        params.append(name + "%")
+    if contact:
+        clauses.append("contact_no = ?")
+        params.append(contact)
+    if room_no:
+        clauses.append("room_no = ?")
+        params.append(room_no)
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+    with db.connection(path) as conn:
+        return conn.execute(f"""SELECT id, room_no, name, contact_no, checkin_date, checkout_date, reason
+            FROM stay_history {where} ORDER BY checkin_date DESC, id DESC LIMIT ?""",
+                            params + [limit]).fetchall()
+
+
+if __name__ == "__main__":
+    # python archive.py run [--keep-months 12]
+    # python archive.py bills [--from YYYY-MM-DD] [--to YYYY-MM-DD] [--customer NAME]
+    # python archive.py stays [--name NAME] [--contact NUMBER] [--room ROOM]
+    parser = argparse.ArgumentParser(description="Move old stays and bills out of the hot tables")
+    parser.add_argument("command", choices=("run", "bills", "stays"))
+    parser.add_argument("--db", default=DB_FILE)
+    parser.add_argument("--dir", default=ARCHIVE_DIR, help="where the per-month bill archives live")
+    parser.add_argument("--keep-months", type=int, default=KEEP_MONTHS)
+    parser.add_argument("--from", dest="date_from")
+    parser.add_argument("--to", dest="date_to")
+    parser.add_argument("--table")
+    parser.add_argument("--customer")
+    parser.add_argument("--name")
+    parser.add_argument("--contact")
+    parser.add_argument("--room")
+    args = parser.parse_args()
+
+    migrations.migrate(args.db)
+    if args.command == "run":
+        stays, months = run_retention(args.keep_months, args.db, args.dir)
+        print(f"{stays} finished stays moved to stay_history", file=sys.stderr)
+        for (year, month), moved in months.items():
+            print(f"{year:04d}-{month:02d}: {moved} bills archived", file=sys.stderr)
+    elif args.command == "bills":
+        for row in search_bills(args.date_from, args.date_to, args.table, args.customer, args.db, args.dir):
+            print("\t".join("" if v is None else str(v) for v in row))
+    else:
+        for row in search_stays(args.name, args.contact, args.room, args.db):
+            print("\t".join("" if v is None else str(v) for v in row))
@@ -0,0 +1,115 @@
+import bisect
+from datetime import date, datetime, timedelta
+
+DATE_FORMATS = ("%Y-%m-%d", "%d-%m-%Y", "%d/%m/%Y", "%Y/%m/%d")
+
+
+def parse_date(text):
+    text = str(text).strip()
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(text, fmt).date()
+        except ValueError:
+            pass
+    raise ValueError(f"Invalid date '{text}'! Use YYYY-MM-DD.")
+
+
+def parse_stay(checkin, checkout):
+    start, end = parse_date(checkin), parse_date(checkout)
+    if end <= start:
+        raise ValueError("Check-out date must be after check-in date!")
+    return start, end
+
+
+# One room's stays as sorted (start, end, occupant id) tuples. Stays are
+# half-open [check-in, check-out). They should not overlap, but older rows
+# may (bookings edited without a check, unreadable dates indexed as
+# forever), so max_ends[i] holds the latest end among stays[:i + 1] and an
+# overlap check walks back from the bisect point only while some earlier
+# stay still ends after the requested start.
+class RoomSchedule:
+    def __init__(self):
+        self.stays = []
+        self.max_ends = []
+
+    def __len__(self):
+        return len(self.stays)
+
+    def add(self, start, end, occ_id):
+        i = bisect.bisect_left(self.stays, (start, end, occ_id))
+        self.stays.insert(i, (start, end, occ_id))
+        self.max_ends.insert(i, end)
+        self.update_max_ends(i)
+
+    def remove(self, start, end, occ_id):
+        i = bisect.bisect_left(self.stays, (start, end, occ_id))
+        if i < len(self.stays) and self.stays[i] == (start, end, occ_id):
+            del self.stays[i]
+            del self.max_ends[i]
+            self.update_max_ends(i)
+
+    def update_max_ends(self, i):
+        latest = self.max_ends[i - 1] if i > 0 else date.min
+        for j in range(i, len(self.stays)):
+            latest = max(latest, self.stays[j][1])
+            self.max_ends[j] = latest
+
+    # First stay overlapping [start, end), skipping the stay being edited.
+    def conflict(self, start, end, ignore=None):
+        i = bisect.bisect_left(self.stays, (end,)) - 1
+        while i >= 0 and self.max_ends[i] > start:
+            stay = self.stays[i]
+            if stay[1] > start and stay[2] != ignore:
+                return stay
+            i -= 1
+        return None
+
+
+# Interval index over every booking, keyed by room.
+class AvailabilityIndex:
+    def __init__(self):
+        self.rooms = {}
+        self.stays = {}
+
+    # rows: (occupant id, room_no, checkin_date, checkout_date). Rows with
+    # dates that cannot be parsed block their room indefinitely, which is how
+    # the old "any row means occupied" check treated every row.
+    @classmethod
+    def from_rows(cls, rows):
+        index = cls()
+        for occ_id, room_no, checkin, checkout in rows:
+            try:
+                start, end = parse_stay(checkin, checkout)
+            except ValueError:
+                start, end = date.min, date.max
+            index.add(occ_id, room_no, start, end)
+        return index
+
+    def add(self, occ_id, room_no, start, end):
+        self.remove(occ_id)
+        room_no = str(room_no).strip()
+        self.rooms.setdefault(room_no, RoomSchedule()).add(start, end, occ_id)
+        self.stays[occ_id] = (room_no, start, end)
+
+    def remove(self, occ_id):
+        stay = self.stays.pop(occ_id, None)
+        if stay:
+            room_no, start, end = stay
+            self.rooms[room_no].remove(start, end, occ_id)
+        return stay
+
+    def conflict(self, room_no, start, end, ignore=None):
+        schedule = self.rooms.get(str(room_no).strip())
+        return schedule.conflict(start, end, ignore) if schedule else None
+
+    def is_free(self, room_no, start, end, ignore=None):
+        return self.conflict(room_no, start, end, ignore) is None
+
+    def free_rooms(self, rooms, start, end):
+        return [room_no for room_no in rooms if self.is_free(room_no, start, end)]
+
+    # Occupant id staying in the room on the given day, or None.
+    def occupant_on(self, room_no, day=None):
+        day = day or date.today()
+        stay = self.conflict(room_no, day, day + timedelta(days=1))
+        return stay[2] if stay else None
@@ -0,0 +1,239 @@
+import argparse
+import json
+import os
+import platform
+import shutil
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+import db
+import guests
+import migrations
+import reports
+from billing_core import BillingEngine
+from bookings import RoomBookings
+from export import chunked
+from rooms import RoomCatalog
+from search import search_occupants
+from tables import TableLayout
+
+SIZES = (10_000, 100_000, 1_000_000)
+REPEAT = 20
+ITEMS_PER_BILL = 5
+STAYS_PER_ROOM = 300
+FIRST_DAY = date(2020, 1, 1)
+ITEM_NAMES = ("Momo", "Chowmein", "Thukpa", "Tea", "Coffee", "Lassi", "Dal Bhat", "Sekuwa")
+GUEST_NAMES = ("Aarav", "Sita", "Ram", "Gita", "Hari", "Maya", "Bikash", "Anita", "Suman", "Puja")
+BATCH = 50_000
+
+
+# Builds a hotel.db-compatible database with `size` occupants and `size`
+# bill line items. Each room gets STAYS_PER_ROOM back-to-back stays, the
+# last of which runs through today so the room status has occupants.
+def generate(path, size):
+    migrations.migrate(path)
+    db.close_pool(path)
+    room_count = max(1, size // STAYS_PER_ROOM)
+    today = date.today()
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA synchronous=OFF")
+    with conn:
+        type_id = conn.execute("SELECT id FROM room_types ORDER BY id LIMIT 1").fetchone()[0]
+        conn.executemany("INSERT OR IGNORE INTO menu_items (name, price) VALUES (?, 250)",
+                         [(name,) for name in ITEM_NAMES])
+        menu_ids = [conn.execute("SELECT id FROM menu_items WHERE name = ?", (name,)).fetchone()[0]
+                    for name in ITEM_NAMES]
+        conn.executemany("INSERT OR IGNORE INTO rooms (room_no, floor, room_type_id, status) VALUES (?, ?, ?, 'Clean')",
+                         ((str(1000 + r), 10 + r // 100, type_id) for r in range(room_count)))
+
+        last_stay = (size - 1) // room_count
+
+        def occupants():
+            for i in range(size):
+                stay, room = divmod(i, room_count)
+                end = today + timedelta(days=2 - 3 * (last_stay - stay))
+                start = end - timedelta(days=3)
+                yield (str(1000 + room), f"{GUEST_NAMES[i % len(GUEST_NAMES)]} Guest{i}",
+                       f"98{i:08d}"[-10:], "Kathmandu", "Male" if i % 2 else "Female",
+                       start.isoformat(), end.isoformat())
+        for batch in chunked(occupants(), BATCH):
+            conn.executemany("""INSERT INTO occupants
+                (room_no, name, contact_no, address, gender, checkin_date, checkout_date)
+                VALUES (?, ?, ?, ?, ?, ?, ?)""", batch)
+
+        bill_count = max(1, size // ITEMS_PER_BILL)
+        days = max(1, (today - FIRST_DAY).days)
+        first_id = (conn.execute("SELECT MAX(id) FROM bills").fetchone()[0] or 0) + 1
+        first_no = conn.execute("SELECT next_value FROM sequences WHERE name = 'bill_number'").fetchone()[0]
+
+        def bills():
+            for b in range(bill_count):
+                yield (first_id + b, first_no + b, f"Table-{b % 8 + 1}", "Guest", "9800000000",
+                       (FIRST_DAY + timedelta(days=b * days // bill_count)).isoformat(),
+                       ITEMS_PER_BILL * 250.0)
+        for batch in chunked(bills(), BATCH):
+            conn.executemany("""INSERT INTO bills
+                (id, bill_number, table_number, customer_name, customer_contact, date, total_cost)
+                VALUES (?, ?, ?, ?, ?, ?, ?)""", batch)
+
+        def items():
+            for i in range(bill_count * ITEMS_PER_BILL):
+                yield (first_id + i // ITEMS_PER_BILL, ITEM_NAMES[i % len(ITEM_NAMES)], 1, 250.0, 250.0,
+                       menu_ids[i % len(ITEM_NAMES)])
+        for batch in chunked(items(), BATCH):
+            conn.executemany("""INSERT INTO bill_items
+                (bill_id, item_name, item_quantity, cost_per_item, total_cost, menu_item_id)
+                VALUES (?, ?, ?, ?, ?, ?)""", batch)
+        # The sequence has to start past the generated bill numbers.
+        conn.execute("UPDATE sequences SET next_value = ? WHERE name = 'bill_number'",
+                     (first_no + bill_count,))
+    conn.execute("ANALYZE")
+    # Fold the WAL into the main file so the database can be copied alone.
+    conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    conn.close()
+
+
+def time_runs(fn, repeat, setup=None):
+    times = []
+    for run in range(repeat):
+        arg = setup(run) if setup else None
+        start = time.perf_counter()
+        fn(arg) if setup else fn()
+        times.append((time.perf_counter() - start) * 1000)
+    return times
+
+
+def summary(size, operation, times):
+    return {
+        'size': size,
+        'operation': operation,
+        'runs': len(times),
+        'min_ms': round(min(times), 3),
+        'median_ms': round(statistics.median(times), 3),
+        'mean_ms': round(statistics.fmean(times), 3),
+        'max_ms': round(max(times), 3),
+    }
+
+
+# The hot paths of the billing and room windows, without Tk.
+def run_operations(path, size, repeat):
+    results = []
+    seconds = guests.dedupe(path)[2]
+    results.append(summary(size, 'dedupe_guests', [seconds * 1000]))
+
+    catalog = RoomCatalog(path)
+    start = time.perf_counter()
+    bookings = RoomBookings(catalog, path)
+    results.append(summary(size, 'load_bookings', [(time.perf_counter() - start) * 1000]))
+
+    engine = BillingEngine(path, layout=TableLayout.numbered(8))
+
+    def fill_table(run):
+        engine.reset_bill('1')
+        engine.generate_bill('1', "Bench Guest", "9800000000")
+        for i in range(10):
+            engine.add_item('1', ITEM_NAMES[i % len(ITEM_NAMES)], 2, 125)
+    results.append(summary(size, 'menu_complete', time_runs(lambda: engine.menu.complete("c"), repeat)))
+    results.append(summary(size, 'save_bill', time_runs(lambda _: engine.save_bill('1'), repeat, fill_table)))
+
+    # Bookings far in the future, three nights apart, in the first room.
+    room_no = next(iter(catalog))
+    far = date(2100, 1, 1)
+
+    def add_occupant(run):
+        start = far + timedelta(days=3 * run)
+        bookings.add_occupant(room_no, "Bench Guest", "9800000000", "Kathmandu", "Male",
+                              start.isoformat(), (start + timedelta(days=2)).isoformat())
+    results.append(summary(size, 'add_occupant', time_runs(add_occupant, repeat, lambda run: run)))
+
+    def refresh_room_status():
+        catalog.ensure_fresh()
+        occupied = bookings.current_occupants()
+        return [(room_no, occupied.get(room_no)) for room_no in catalog]
+    results.append(summary(size, 'refresh_room_status', time_runs(refresh_room_status, repeat)))
+
+    contacts = [f"98{i:08d}"[-10:] for i in range(0, size, max(1, size // repeat))][:repeat]
+    results.append(summary(size, 'guest_lookup', time_runs(
+        lambda run: bookings.guests.lookup(contacts[run % len(contacts)]), repeat, lambda run: run)))
+
+    results.append(summary(size, 'view_occupants', time_runs(lambda: bookings.occupant_page(), repeat)))
+
+    results.append(summary(size, 'search_name', time_runs(
+        lambda: search_occupants("Name", "Maya", path), repeat)))
+
+    today = date.today()
+    results.append(summary(size, 'month_report', time_runs(
+        lambda: reports.month_report(today.year, today.month, path), repeat)))
+    db.close_pool(path)
+    return results
+
+
+def run(sizes, repeat, workdir, keep=False):
+    results = []
+    for size in sizes:
+        path = os.path.join(workdir, f"bench_{size}.db")
+        start = time.perf_counter()
+        if not os.path.exists(path):
+            generate(path, size)
+        results.append(summary(size, 'generate', [(time.perf_counter() - start) * 1000]))
+        print(f"[bench] {size:>10} rows ready in {results[-1]['min_ms'] / 1000:.1f} s", file=sys.stderr)
+        copy = path + ".run"
+        shutil.copyfile(path, copy)
+        try:
+            results.extend(run_operations(copy, size, repeat))
+        finally:
+            for suffix in ("", "-wal", "-shm"):
+                if os.path.exists(copy + suffix):
+                    os.remove(copy + suffix)
+            if not keep:
+                os.remove(path)
+    return {
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'sqlite': sqlite3.sqlite_version,
+        'platform': platform.platform(),
+        'repeat': repeat,
+        'results': results,
+    }
+
+
+# Prints median time per (size, operation) against a previous run.
+def compare(report, baseline):
+    before = {(r['size'], r['operation']): r['median_ms'] for r in baseline['results']}
+    for r in report['results']:
+        old = before.get((r['size'], r['operation']))
+        change = f"{(r['median_ms'] - old) / old * 100:+7.1f}%" if old else "    new"
+        print(f"{r['size']:>10} {r['operation']:<22} {r['median_ms']:>10.3f} ms {change}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark booking, billing and reporting hot paths")
+    parser.add_argument("--sizes", default=",".join(str(s) for s in SIZES),
+                        help="comma separated occupant/line item counts, e.g. 10000,100000")
+    parser.add_argument("--repeat", type=int, default=REPEAT)
+    parser.add_argument("--output", help="write JSON results here instead of stdout")
+    parser.add_argument("--compare", help="previous JSON results to compare against")
+    parser.add_argument("--dir", help="where to keep generated databases (reused between runs)")
+    args = parser.parse_args()
+
+    sizes = [int(s) for s in args.sizes.split(",")]
+    workdir = args.dir or tempfile.mkdtemp(prefix="hotel-bench-")
+    try:
+        report = run(sizes, args.repeat, workdir, keep=bool(args.dir))
+    finally:
+        if not args.dir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            compare(report, json.load(f))
@@ -1,70 +1,45 @@
-from tkinter import Tk, Label, Entry, Button, LabelFrame, Text, Scrollbar, END, StringVar, messagebox, Toplevel, ttk
-import random
+from tkinter import Tk, Label, Entry, Button, Frame, LabelFrame, Listbox, Text, Scrollbar, END, StringVar, messagebox, Toplevel, ttk
 from datetime import datetime
-import sqlite3
-import os
+
+import db
+import instrument
+import migrations
+from billing_core import BillingEngine, is_float
+from diagnostics import open_panel
+from journal import OrderJournal, read_events
+from receipt import item_line, render_session, table_name, total_block
+from records import RecordsWindow
+from writer import BackgroundWriter
 
 
 def ensure_database_schema():
-    db_path = 'hotel.db'
-    recreate = False
-    if os.path.exists(db_path):
-        conn = sqlite3.connect(db_path)
-        cursor = conn.cursor()
-        cursor.execute("PRAGMA table_info(Hotel)")
-        columns = [info[1] for info in cursor.fetchall()]
-        conn.close()
-        if 'table_number' not in columns:
-            recreate = True
-    else:
-        recreate = True
-
-    if recreate:
-        if os.path.exists(db_path):
-            os.remove(db_path)
-        conn = sqlite3.connect(db_path)
-        cursor = conn.cursor()
-        cursor.execute('''
-            CREATE TABLE Hotel (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                table_number TEXT,
-                customer_name TEXT,
-                customer_contact TEXT,
-                item_name TEXT,
-                item_quantity INTEGER,
-                cost_per_item REAL,
-                bill_number INTEGER,
-                date TEXT,
-                total_cost REAL
-            )
-        ''')
-        conn.commit()
-        conn.close()
+    migrations.migrate(db.DB_FILE)
 
 
 class HotelManagementSystem:
     def __init__(self, win):
         self.win = win
         self.win.geometry("1350x680")
-        self.win.title("Hotel Management System - 8 Tables")
         self.win.configure(bg='#f0f0f0')
 
-        # Each table has its own independent data
-        self.tables_data = {
-            i: {
-                'bill_no': random.randint(1000, 9999),
-                'customer_name': StringVar(),
-                'customer_contact': StringVar(),
-                'items_list': [],
-                'grand_total': 0.0
-            } for i in range(1, 9)
-        }
-
-        self.current_table = StringVar(value="1")
+        # Each table has its own independent data, kept in the headless engine.
+        # Open orders survive a crash through the order journal.
+        self.engine = BillingEngine(journal=OrderJournal())
+        self.engine.recover(read_events())
+        # Bills are written on a background thread; see writer.py.
+        self.writer = BackgroundWriter(self.win, name="billing-writer")
+        self.win.protocol("WM_DELETE_WINDOW", self.on_close)
+        self.win.bind("<F12>", lambda e: open_panel(self.win))
+        layout = self.engine.layout
+        zones = list(layout.zones)
+        self.win.title(f"Hotel Management System - {len(layout)} Tables")
+
+        self.current_zone = StringVar(value=zones[0])
+        self.current_table = StringVar(value=layout.zones[zones[0]][0])
         self.date_today = StringVar(value=datetime.now().strftime("%Y-%m-%d"))
 
         # Title
-        Label(self.win, text='Hotel Management System (8 Tables)', font='Arial 28 bold', bg='#158aff', fg='white', bd=8, relief='groove').pack(side='top', fill='x')
+        Label(self.win, text=f'Hotel Management System ({len(layout)} Tables)', font='Arial 28 bold', bg='#158aff', fg='white', bd=8, relief='groove').pack(side='top', fill='x')
 
         main_frame = LabelFrame(self.win, bg='#f0f0f0')
         main_frame.pack(pady=10, padx=10, fill='both', expand=True)
@@ -74,10 +49,15 @@ class HotelManagementSystem:
         self.entry_frame.grid(row=0, column=0, padx=10, pady=10, sticky='n')
 
         Label(self.entry_frame, text="Select Table:", font=('Arial', 12, 'bold'), bg='#f0f0f0').grid(row=0, column=0, padx=5, pady=8, sticky='w')
-        ttk.Combobox(self.entry_frame, textvariable=self.current_table, values=[str(i) for i in range(1,9)], state="readonly", font=('Arial', 12), width=10).grid(row=0, column=1, padx=5, pady=8)
+        table_picker = Frame(self.entry_frame, bg='#f0f0f0')
+        table_picker.grid(row=0, column=1, padx=5, pady=8)
+        ttk.Combobox(table_picker, textvariable=self.current_zone, values=zones, state="readonly", font=('Arial', 12), width=10).pack(side='left')
+        self.table_combobox = ttk.Combobox(table_picker, textvariable=self.current_table, values=layout.zones[zones[0]], state="readonly", font=('Arial', 12), width=6)
+        self.table_combobox.pack(side='left', padx=(5, 0))
+        self.current_zone.trace("w", lambda *args: self.switch_zone())
         self.current_table.trace("w", lambda *args: self.switch_table())
 
-        self.table_display = Label(self.entry_frame, text="Active: Table-1", font=('Arial', 14, 'bold'), bg='#ffcc00', fg='black', width=20)
+        self.table_display = Label(self.entry_frame, text="", font=('Arial', 14, 'bold'), bg='#ffcc00', fg='black', width=20)
         self.table_display.grid(row=0, column=2, padx=20, pady=8)
 
         # Input Fields
@@ -93,8 +73,21 @@ class HotelManagementSystem:
             row += 1
 
         
-        self.entries['customer_name'].bind('<KeyRelease>', lambda e: self.get_current_data()['customer_name'].set(self.entries['customer_name'].get()))
-        self.entries['contact_number'].bind('<KeyRelease>', lambda e: self.get_current_data()['customer_contact'].set(self.entries['contact_number'].get()))
+        self.entries['customer_name'].bind('<KeyRelease>', lambda e: self.engine.set_customer(self.current_table.get(), name=self.entries['customer_name'].get()))
+        self.entries['contact_number'].bind('<KeyRelease>', self.contact_changed)
+
+        # Menu autocomplete: matching items drop down under Item Name as the
+        # cashier types; picking one fills in the name and price.
+        self.suggestions = Listbox(self.entry_frame, font=('Arial', 11), height=6)
+        self.suggested_items = []
+        item_entry = self.entries['item_name']
+        item_entry.bind('<FocusIn>', lambda e: self.engine.menu.ensure_fresh())
+        item_entry.bind('<KeyRelease>', self.suggest_items)
+        item_entry.bind('<Down>', self.focus_suggestions)
+        item_entry.bind('<Escape>', lambda e: self.hide_suggestions())
+        self.suggestions.bind('<ButtonRelease-1>', self.pick_suggestion)
+        self.suggestions.bind('<Return>', self.pick_suggestion)
+        self.suggestions.bind('<Escape>', lambda e: (self.hide_suggestions(), item_entry.focus_set()))
 
         # Date & Bill No
         Label(self.entry_frame, text="Date:", font=('Arial', 12), bg='#f0f0f0').grid(row=row, column=0, sticky='w', padx=5, pady=5)
@@ -104,6 +97,14 @@ class HotelManagementSystem:
         Label(self.entry_frame, text="Bill No:", font=('Arial', 12), bg='#f0f0f0').grid(row=row, column=0, sticky='w', padx=5, pady=5)
         self.bill_no_label = Label(self.entry_frame, text="", font=('Arial', 12, 'bold'), bg='#e0e0e0', width=20)
         self.bill_no_label.grid(row=row, column=1, padx=5, pady=5)
+        row += 1
+
+        # Charge the bill to a guest's room instead of paying at the table.
+        Label(self.entry_frame, text="Charge to Room:", font=('Arial', 12), bg='#f0f0f0').grid(row=row, column=0, sticky='w', padx=5, pady=5)
+        self.room_entry = Entry(self.entry_frame, font=('Arial', 12), width=25)
+        self.room_entry.grid(row=row, column=1, padx=5, pady=5)
+        self.room_entry.bind('<Return>', self.charge_to_room)
+        Button(self.entry_frame, text="Charge", width=10, bg='#158aff', fg='white', command=self.charge_to_room).grid(row=row, column=2, padx=5, pady=5)
 
         # Buttons
         btn_frame = LabelFrame(self.entry_frame, text="Actions", font=('Arial', 12), bg='#f0f0f0')
@@ -121,171 +122,239 @@ class HotelManagementSystem:
         self.bill_frame = LabelFrame(main_frame, text="Bill Receipt", font=('Arial', 14), bd=7, relief='groove', bg='#f0f0f0')
         self.bill_frame.grid(row=0, column=1, padx=10, pady=10, sticky='nsew')
 
+        # One receipt document per table, rendered the first time the table
+        # is shown and then only appended to or re-rendered when its order changes
         self.y_scroll = Scrollbar(self.bill_frame)
-        self.bill_txt = Text(self.bill_frame, font=('Courier', 11), yscrollcommand=self.y_scroll.set, bg='white')
-        self.y_scroll.config(command=self.bill_txt.yview)
         self.y_scroll.pack(side='right', fill='y')
-        self.bill_txt.pack(fill='both', expand=True)
+        self.receipts = {}
+        self.bill_txt = None
 
         self.switch_table() 
 
+    def on_close(self):
+        self.writer.close()
+        self.engine.journal.close()
+        self.win.destroy()
+
     def get_current_data(self):
-        return self.tables_data[int(self.current_table.get())]
+        return self.engine.get_table(self.current_table.get())
 
+    @instrument.timed("billing_ui.switch_zone")
+    def switch_zone(self, *args):
+        tables = self.engine.layout.zones[self.current_zone.get()]
+        self.table_combobox.config(values=tables)
+        self.current_table.set(tables[0])
+
+    @instrument.timed("billing_ui.switch_table")
     def switch_table(self, *args):
-        table_num = int(self.current_table.get())
+        table_num = self.current_table.get()
         data = self.get_current_data()
 
-        self.table_display.config(text=f"Active: Table-{table_num}")
-        self.bill_no_label.config(text=str(data['bill_no']))
+        self.table_display.config(text=f"Active: {table_name(table_num)}")
+        self.bill_no_label.config(text=str(data.bill_no))
 
         
         self.entries['customer_name'].delete(0, END)
-        self.entries['customer_name'].insert(0, data['customer_name'].get())
+        self.entries['customer_name'].insert(0, data.customer_name)
         self.entries['contact_number'].delete(0, END)
-        self.entries['contact_number'].insert(0, data['customer_contact'].get())
-
-        
-        self.bill_txt.delete(1.0, END)
-        self.bill_txt.insert(END, "\t\t\t  Stay-In Hotel\n")
-        self.bill_txt.insert(END, "\t\t\tContact: 977896765\n")
-        self.bill_txt.insert(END, "="*60 + "\n")
-        self.bill_txt.insert(END, f"       Table-{table_num} | Bill No: {data['bill_no']} | {self.date_today.get()}\n")
-        self.bill_txt.insert(END, "="*60 + "\n")
-
-        if data['customer_name'].get():
-            self.bill_txt.insert(END, f"Customer: {data['customer_name'].get()}\n")
-            self.bill_txt.insert(END, f"Contact : {data['customer_contact'].get()}\n")
-            self.bill_txt.insert(END, "-"*60 + "\n")
-            self.bill_txt.insert(END, f"{'Item Name':<20} {'Qty':<8} {'Rate':<10} {'Total'}\n")
-            self.bill_txt.insert(END, "-"*60 + "\n")
-
-            for name, qty, cost, total in data['items_list']:
-                self.bill_txt.insert(END, f"{name:<20} {qty:<8} ${cost:<9.2f} ${total:.2f}\n")
-
-            if data['grand_total'] > 0:
-                self.bill_txt.insert(END, "-"*60 + "\n")
-                self.bill_txt.insert(END, f"{'GRAND TOTAL':>50} ${data['grand_total']:.2f}\n")
-                self.bill_txt.insert(END, "="*60 + "\n")
-                self.bill_txt.insert(END, "          Thank You! Visit Again!\n")
+        self.entries['contact_number'].insert(0, data.customer_contact)
+        self.room_entry.delete(0, END)
+        self.room_entry.insert(0, data.room_no)
+
+        self.show_receipt(table_num)
+
+    def receipt_widget(self, table_num):
+        txt = self.receipts.get(table_num)
+        if txt is None:
+            txt = Text(self.bill_frame, font=('Courier', 11), yscrollcommand=self.y_scroll.set, bg='white')
+            txt.insert(END, render_session(self.engine.get_table(table_num), self.date_today.get()))
+            self.receipts[table_num] = txt
+        return txt
+
+    # Swaps the visible receipt for the table's cached one.
+    def show_receipt(self, table_num):
+        txt = self.receipt_widget(table_num)
+        if txt is self.bill_txt:
+            return
+        if self.bill_txt is not None:
+            self.bill_txt.pack_forget()
+        self.y_scroll.config(command=txt.yview)
+        txt.pack(fill='both', expand=True)
+        self.bill_txt = txt
+
+    # Re-renders one table's receipt after a change that is not a plain append.
+    def rerender_receipt(self, table_num):
+        txt = self.receipt_widget(table_num)
+        txt.delete(1.0, END)
+        txt.insert(END, render_session(self.engine.get_table(table_num), self.date_today.get()))
 
     def generate_bill(self):
-        table_num = int(self.current_table.get())
-        data = self.get_current_data()
-        name = self.entries['customer_name'].get().strip()
-        contact = self.entries['contact_number'].get().strip()
-
-        if not name or len(contact) != 10 or not contact.isdigit():
-            messagebox.showerror("Invalid Input", "Enter valid name and 10-digit phone number!")
+        table_num = self.current_table.get()
+        try:
+            data = self.engine.generate_bill(table_num, self.entries['customer_name'].get(),
+                                             self.entries['contact_number'].get())
+        except ValueError as e:
+            messagebox.showerror("Invalid Input", str(e))
             return
 
-        data['customer_name'].set(name)
-        data['customer_contact'].set(contact)
-        data['items_list'] = []
-        data['grand_total'] = 0.0
-
-        self.bill_txt.delete(1.0, END)
-        self.bill_txt.insert(END, "\t\t\t  Stay-In Hotel\n")
-        self.bill_txt.insert(END, "\t\t\tContact: 977896765\n")
-        self.bill_txt.insert(END, "="*60 + "\n")
-        self.bill_txt.insert(END, f"       Table-{table_num} | Bill No: {data['bill_no']} | {self.date_today.get()}\n")
-        self.bill_txt.insert(END, "="*60 + "\n")
-        self.bill_txt.insert(END, f"Customer: {name}\n")
-        self.bill_txt.insert(END, f"Contact : {contact}\n")
-        self.bill_txt.insert(END, "-"*60 + "\n")
-        self.bill_txt.insert(END, f"{'Item Name':<20} {'Qty':<8} {'Rate':<10} {'Total'}\n")
-        self.bill_txt.insert(END, "-"*60 + "\n")
+        self.bill_no_label.config(text=str(data.bill_no))
+        self.room_entry.delete(0, END)
+        self.rerender_receipt(table_num)
 
+    def charge_to_room(self, event=None):
+        table_num = self.current_table.get()
+        room_no = self.room_entry.get().strip()
+        try:
+            self.engine.charge_to_room(table_num, room_no)
+        except ValueError as e:
+            messagebox.showerror("Invalid Room", str(e))
+            return
+        if room_no:
+            messagebox.showinfo("Room Charge", f"{table_name(table_num)} will be charged to Room {room_no}.")
+
+    # Repeat guests get their name filled in once the number is complete.
+    def contact_changed(self, event=None):
+        table_num = self.current_table.get()
+        self.engine.set_customer(table_num, contact=self.entries['contact_number'].get())
+        guest = self.engine.guests.lookup(self.entries['contact_number'].get())
+        if guest is not None and guest.name and not self.entries['customer_name'].get().strip():
+            self.entries['customer_name'].insert(0, guest.name)
+            self.engine.set_customer(table_num, name=guest.name)
+
+    @instrument.timed("billing_ui.add_item")
     def add_item(self):
-        data = self.get_current_data()
-        item = self.entries['item_name'].get().strip()
-        qty_str = self.entries['item_quantity'].get().strip()
-        cost_str = self.entries['cost_per_item'].get().strip()
-
-        if not item or not qty_str.isdigit() or not self.is_float(cost_str):
-            messagebox.showerror("Error", "Please enter valid item name, quantity and price!")
+        try:
+            item, qty, cost, total = self.engine.add_item(self.current_table.get(),
+                                                          self.entries['item_name'].get(),
+                                                          self.entries['item_quantity'].get(),
+                                                          self.entries['cost_per_item'].get())
+        except ValueError as e:
+            messagebox.showerror("Error", str(e))
             return
 
-        qty = int(qty_str)
-        cost = float(cost_str)
-        total = qty * cost
-
-        data['items_list'].append((item, qty, cost, total))
-        data['grand_total'] += total
-
-        self.bill_txt.insert(END, f"{item:<20} {qty:<8} ${cost:<9.2f} ${total:.2f}\n")
+        self.bill_txt.insert(END, item_line(item, qty, cost, total))
 
+        self.hide_suggestions()
         self.entries['item_name'].delete(0, END)
         self.entries['item_quantity'].delete(0, END)
         self.entries['cost_per_item'].delete(0, END)
 
+    @instrument.timed("billing_ui.suggest_items")
+    def suggest_items(self, event=None):
+        if event is not None and event.keysym in ('Down', 'Up', 'Return', 'Escape', 'Tab'):
+            return
+        entry = self.entries['item_name']
+        self.suggested_items = self.engine.menu.complete(entry.get())
+        if not self.suggested_items or (len(self.suggested_items) == 1 and
+                                        self.suggested_items[0].name == entry.get().strip()):
+            self.hide_suggestions()
+            return
+        self.suggestions.delete(0, END)
+        for item in self.suggested_items:
+            self.suggestions.insert(END, f"{item.name}  -  {item.price:.2f}")
+        self.suggestions.place(in_=entry, relx=0, rely=1, relwidth=1)
+        self.suggestions.lift()
+
+    def focus_suggestions(self, event=None):
+        if self.suggestions.winfo_ismapped():
+            self.suggestions.focus_set()
+            self.suggestions.selection_clear(0, END)
+            self.suggestions.selection_set(0)
+            self.suggestions.activate(0)
+
+    def pick_suggestion(self, event=None):
+        selected = self.suggestions.curselection()
+        if not selected:
+            return
+        item = self.suggested_items[selected[0]]
+        self.entries['item_name'].delete(0, END)
+        self.entries['item_name'].insert(0, item.name)
+        self.entries['cost_per_item'].delete(0, END)
+        self.entries['cost_per_item'].insert(0, f"{item.price:g}")
+        self.hide_suggestions()
+        self.entries['item_quantity'].focus_set()
+
+    def hide_suggestions(self):
+        self.suggestions.place_forget()
+
+    @instrument.timed("billing_ui.calculate_total")
     def calculate_total(self):
-        data = self.get_current_data()
-        if data['grand_total'] == 0:
+        grand_total = self.engine.calculate_total(self.current_table.get())
+        if grand_total == 0:
             messagebox.showwarning("No Items", "Please add items first!")
             return
-        self.bill_txt.insert(END, "-"*60 + "\n")
-        self.bill_txt.insert(END, f"{'GRAND TOTAL':>50} ${data['grand_total']:.2f}\n")
-        self.bill_txt.insert(END, "="*60 + "\n")
-        self.bill_txt.insert(END, "          Thank You! Visit Again!\n")
+        self.bill_txt.insert(END, total_block(grand_total))
 
     def clear_fields(self):
+        self.hide_suggestions()
         for field in ['item_name', 'item_quantity', 'cost_per_item']:
             self.entries[field].delete(0, END)
 
     def reset_bill(self):
         if messagebox.askyesno("Reset", "Clear all data for this table?"):
-            table = int(self.current_table.get())
-            self.tables_data[table] = {
-                'bill_no': random.randint(1000, 9999),
-                'customer_name': StringVar(),
-                'customer_contact': StringVar(),
-                'items_list': [],
-                'grand_total': 0.0
-            }
+            table_num = self.current_table.get()
+            self.engine.reset_bill(table_num)
+            self.rerender_receipt(table_num)
             self.entries['customer_name'].delete(0, END)
             self.entries['contact_number'].delete(0, END)
             self.switch_table()
 
     def save_bill(self):
         data = self.get_current_data()
-        table_num = int(self.current_table.get())
+        table_num = self.current_table.get()
 
-        if not data['items_list']:
+        if not data.items_list:
             messagebox.showwarning("Empty", "No items to save!")
             return
 
+        if data.bill_no in self.engine.saving:
+            messagebox.showwarning("Saving", f"Bill {data.bill_no} is already being saved.")
+            return
+
         if messagebox.askyesno("Save Bill", f"Save bill for Table-{table_num}?"):
-            try:
-                conn = sqlite3.connect('hotel.db')
-                cursor = conn.cursor()
-                for name, qty, cost, total in data['items_list']:
-                    cursor.execute('''
-                        INSERT INTO Hotel 
-                        (table_number, customer_name, customer_contact, item_name, item_quantity, 
-                         cost_per_item, bill_number, date, total_cost)
-                        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-                    ''', (f"Table-{table_num}", data['customer_name'].get(), data['customer_contact'].get(),
-                          name, qty, cost, data['bill_no'], self.date_today.get(), total))
-                conn.commit()
-                conn.close()
-                messagebox.showinfo("Success", f"Bill saved for Table-{table_num}!")
-            except Exception as e:
+            # A copy of the order is saved, so the table stays usable while
+            # the write is in flight; once it lands the table starts a new
+            # bill, keeping anything added meanwhile.
+            bill_no, count = data.bill_no, len(data.items_list)
+            self.engine.saving.add(bill_no)
+
+            def done(result):
+                self.engine.finish_save(table_num, bill_no, count)
+                self.rerender_receipt(table_num)
+                if self.current_table.get() == table_num:
+                    self.switch_table()
+                messagebox.showinfo("Success", f"Bill saved for Table-{table_num}!\n"
+                                               f"{result.rows} items in {result.seconds * 1000:.1f} ms")
+
+            def failed(e):
+                self.engine.saving.discard(bill_no)
                 messagebox.showerror("Error", f"Save failed: {e}")
+            self.writer.submit(None, (data.copy(), self.date_today.get()),
+                               on_done=done, on_error=failed, batch=self.save_batch)
+
+    # Runs on the writer thread: every save queued together goes into one
+    # transaction per bill date, and each table's bill saves or fails on
+    # its own.
+    def save_batch(self, jobs):
+        results = [None] * len(jobs)
+        for date in {date for data, date in jobs}:
+            indexes = [i for i, (data, d) in enumerate(jobs) if d == date]
+            for i, result in zip(indexes, self.engine.save_each([jobs[i][0] for i in indexes], date)):
+                results[i] = result
+        return results
 
     def is_float(self, val):
-        try:
-            float(val)
-            return True
-        except:
-            return False
+        return is_float(val)
 
     def view_records(self):
-        
-        pass  
+        win = Toplevel(self.win)
+        win.transient(self.win)
+        tables = [f"Table-{label}" for label in self.engine.layout]
+        RecordsWindow(win, self.engine.db_path, tables)
 
 
 if __name__ == "__main__":
+    instrument.setup_logging()
     ensure_database_schema()
     root = Tk()
     app = HotelManagementSystem(root)
@@ -0,0 +1,314 @@
+import time
+from collections import namedtuple
+from datetime import datetime
+
+import db
+import folio
+import guests
+import instrument
+from db import DB_FILE
+from menu import MenuCatalog
+from sequences import BlockSequence
+from tables import TableLayout, TableSessions
+
+# Kept as constant strings so sqlite3's statement cache reuses the same
+# prepared statements for every row and every save.
+INSERT_BILL_SQL = '''
+    INSERT INTO bills
+    (bill_number, table_number, customer_name, customer_contact, date, total_cost, guest_id, occupant_id)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+'''
+INSERT_ITEM_SQL = '''
+    INSERT INTO bill_items
+    (bill_id, item_name, item_quantity, cost_per_item, total_cost, menu_item_id)
+    VALUES (?, ?, ?, ?, ?, ?)
+'''
+
+
+class SaveResult(namedtuple('SaveResult', 'bills rows seconds')):
+    @property
+    def rows_per_sec(self):
+        return self.rows / self.seconds if self.seconds > 0 else float(self.rows)
+
+
+def is_float(val):
+    try:
+        float(val)
+        return True
+    except (TypeError, ValueError):
+        return False
+
+
+def today():
+    return datetime.now().strftime("%Y-%m-%d")
+
+
+# Headless billing core: table sessions, line items, totals and persistence.
+# The Tkinter window in billing.py is only a front end for this class. Each
+# engine serves only its front end's tables (dining_tables.front_end), so
+# an open order lives in exactly one engine and journal.
+class BillingEngine:
+    def __init__(self, db_path=DB_FILE, layout=None, journal=None, menu=None, front_end='desktop'):
+        self.db_path = db_path
+        self.layout = layout or TableLayout.load(db_path, front_end)
+        self.menu = menu or MenuCatalog(db_path)
+        self.guests = guests.directory(db_path)
+        self.bill_numbers = BlockSequence('bill_number', db_path)
+        self.tables = TableSessions(self.layout, self.bill_numbers.next)
+        self.journal = journal
+        # Bill numbers with a save in flight; finish_save clears them.
+        self.saving = set()
+
+    def log(self, event):
+        if self.journal is not None:
+            self.journal.append(event)
+
+    def get_table(self, table_num):
+        return self.tables.get(table_num)
+
+    def set_customer(self, table_num, name=None, contact=None):
+        data = self.get_table(table_num)
+        if name is not None:
+            data.customer_name = name
+        if contact is not None:
+            data.customer_contact = contact
+
+    @instrument.timed("billing.generate_bill")
+    def generate_bill(self, table_num, name, contact):
+        name = name.strip()
+        contact = guests.normalize_contact(contact)
+        if not name or not guests.valid_contact(contact):
+            raise ValueError("Enter valid name and 10-digit phone number!")
+
+        data = self.get_table(table_num)
+        if data.bill_no in self.saving:
+            # The previous order is still being saved under this number.
+            data = self.reset_bill(table_num)
+        data.customer_name = name
+        data.customer_contact = contact
+        data.room_no = ''
+        data.items_list = []
+        data.grand_total = 0.0
+        self.log({'e': 'bill', 't': data.table_num, 'b': data.bill_no, 'n': name, 'c': contact})
+        return data
+
+    @instrument.timed("billing.add_item")
+    def add_item(self, table_num, item, qty, cost):
+        item = str(item).strip()
+        qty = str(qty).strip()
+        cost = str(cost).strip()
+        # Menu items get their menu spelling, and their menu price when no
+        # cost is entered and the menu has a real price for them. Items
+        # added since the menu was loaded (e.g. by a saved bill) count too.
+        self.menu.ensure_fresh()
+        menu_item = self.menu.get(item) if item else None
+        if menu_item is not None:
+            item = menu_item.name
+            if not cost and menu_item.price > 0:
+                cost = str(menu_item.price)
+        if not item or not qty.isdigit() or not is_float(cost):
+            raise ValueError("Please enter valid item name, quantity and price!")
+
+        qty = int(qty)
+        cost = float(cost)
+        line = (item, qty, cost, qty * cost)
+
+        data = self.get_table(table_num)
+        data.items_list.append(line)
+        data.grand_total += line[3]
+        self.log({'e': 'item', 't': data.table_num, 'b': data.bill_no, 'i': line})
+        return line
+
+    # Charges the table's bill to a room: when saved it is posted to the
+    # folio of whoever is staying there that day. An empty room_no means
+    # the bill is paid at the table.
+    def charge_to_room(self, table_num, room_no):
+        room_no = str(room_no).strip()
+        if room_no:
+            with db.connection(self.db_path) as conn:
+                if folio.occupant_in_room(conn, room_no, today()) is None:
+                    raise ValueError(f"No guest is staying in Room {room_no}!")
+        data = self.get_table(table_num)
+        data.room_no = room_no
+        self.log({'e': 'room', 't': data.table_num, 'b': data.bill_no, 'r': room_no})
+        return data
+
+    def calculate_total(self, table_num):
+        return self.get_table(table_num).grand_total
+
+    def reset_bill(self, table_num):
+        self.log({'e': 'reset', 't': str(table_num)})
+        return self.tables.reset(table_num)
+
+    def save_bill(self, table_num, date=None):
+        if not self.get_table(table_num).items_list:
+            raise ValueError("No items to save!")
+        return self.save_bills([table_num], date)
+
+    # Writes every given table's bill in one transaction: one bills row per
+    # table, then a single executemany for all line items. Tables without
+    # items are skipped; by default every open table is saved. Each saved
+    # table then starts a new bill (see finish_save).
+    @instrument.timed("billing.save_bills")
+    def save_bills(self, table_nums=None, date=None):
+        date = date or today()
+        if table_nums is None:
+            sessions = self.tables.active()
+        else:
+            sessions = [self.get_table(t) for t in table_nums]
+        sessions = [data for data in sessions if data.items_list]
+        result = self.save_sessions(sessions, date)
+        for data in sessions:
+            self.finish_save(data.table_num, data.bill_no, len(data.items_list))
+        return result
+
+    # Writes the given sessions as saved bills. They may be detached copies
+    # (TableSession.copy), so this can run off the UI thread; the tables
+    # themselves are only touched by finish_save.
+    def save_sessions(self, sessions, date=None):
+        date = date or today()
+        sessions = [data for data in sessions if data.items_list]
+
+        start = time.perf_counter()
+        rows = []
+        with db.transaction(self.db_path) as conn:
+            for data in sessions:
+                rows.extend(self.write_bill(conn, data, date))
+            conn.executemany(INSERT_ITEM_SQL, rows)
+        return SaveResult(len(sessions), len(rows), time.perf_counter() - start)
+
+    # Like save_sessions, but each bill is written under its own savepoint,
+    # so one table failing (e.g. its room guest has left) does not fail the
+    # rest. Returns a SaveResult or the exception for each session, in order.
+    def save_each(self, sessions, date=None):
+        date = date or today()
+        results = []
+        with db.transaction(self.db_path) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            for data in sessions:
+                start = time.perf_counter()
+                conn.execute("SAVEPOINT save_bill")
+                try:
+                    if not data.items_list:
+                        raise ValueError("No items to save!")
+                    rows = self.write_bill(conn, data, date)
+                    conn.executemany(INSERT_ITEM_SQL, rows)
+                except Exception as e:
+                    conn.execute("ROLLBACK TO save_bill")
+                    results.append(e)
+                else:
+                    results.append(SaveResult(1, len(rows), time.perf_counter() - start))
+                conn.execute("RELEASE save_bill")
+        return results
+
+    # Inserts one session's bill inside an open transaction and returns its
+    # line item rows. Items not on the menu yet are added to it at the price
+    # they were sold for.
+    def write_bill(self, conn, data, date):
+        guest_id = self.guests.record(conn, data.customer_contact, data.customer_name, day=date)
+        occupant_id = None
+        if data.room_no:
+            occupant_id = folio.occupant_in_room(conn, data.room_no, date)
+            if occupant_id is None:
+                raise ValueError(f"No guest is staying in Room {data.room_no} to charge!")
+            folio.open_folio(conn, occupant_id)
+        bill_id = conn.execute(INSERT_BILL_SQL, (
+            data.bill_no, f"Table-{data.table_num}", data.customer_name,
+            data.customer_contact, date, data.grand_total, guest_id, occupant_id)).lastrowid
+        return [(bill_id,) + line + (self.menu.resolve(conn, line[0], line[2]),)
+                for line in data.items_list]
+
+    # Ends a table's bill once its first `count` items are saved as bill_no.
+    # Runs on the thread that owns the tables (the Tk thread, or under the
+    # API's lock). Items added while the save was running move to a new bill
+    # for the same customer and room; otherwise the table is left idle.
+    # Does nothing if the table has moved on to another bill meanwhile.
+    def finish_save(self, table_num, bill_no, count):
+        self.saving.discard(bill_no)
+        data = self.tables.sessions.get(str(table_num))
+        if data is None or data.bill_no != bill_no:
+            return None
+        self.log({'e': 'save', 't': data.table_num, 'b': bill_no, 'n': count})
+        data = self.carry_over(data, count)
+        if data is not None:
+            for event in self.session_events(data):
+                self.log(event)
+        return data
+
+    def carry_over(self, data, count):
+        leftover = data.items_list[count:]
+        self.tables.discard(data.table_num)
+        if not leftover:
+            return None
+        new = self.tables.get(data.table_num)
+        new.customer_name = data.customer_name
+        new.customer_contact = data.customer_contact
+        new.room_no = data.room_no
+        new.items_list = leftover
+        new.grand_total = sum(line[3] for line in leftover)
+        return new
+
+    # Rebuilds the open orders recorded in the journal (see journal.py),
+    # then compacts the journal down to just those orders.
+    def recover(self, events):
+        for event in events:
+            self.apply_event(event)
+        self.drop_saved()
+        if self.journal is not None:
+            self.journal.rewrite(self.snapshot())
+
+    # Ends orders whose bill reached the database but whose save never
+    # reached the journal, e.g. a crash right after the commit.
+    def drop_saved(self):
+        active = {data.bill_no: data for data in self.tables.active()}
+        if not active:
+            return
+        marks = ", ".join("?" * len(active))
+        with db.connection(self.db_path) as conn:
+            saved = conn.execute(f"""SELECT b.bill_number, COUNT(i.id) FROM bills b
+                LEFT JOIN bill_items i ON i.bill_id = b.id
+                WHERE b.bill_number IN ({marks}) GROUP BY b.id""", list(active)).fetchall()
+        for bill_no, count in saved:
+            self.carry_over(active[bill_no], count)
+
+    def apply_event(self, event):
+        label = str(event.get('t'))
+        if label not in self.layout:
+            return
+        kind = event.get('e')
+        if kind == 'reset':
+            self.tables.discard(label)
+        elif kind == 'save':
+            data = self.tables.sessions.get(label)
+            if data is not None and data.bill_no == event['b']:
+                self.carry_over(data, event.get('n', len(data.items_list)))
+        elif kind == 'bill':
+            data = self.tables.restore(label, event['b'])
+            data.customer_name = event['n']
+            data.customer_contact = event['c']
+        elif kind == 'room':
+            data = self.tables.sessions.get(label)
+            if data is None or data.bill_no != event['b']:
+                data = self.tables.restore(label, event['b'])
+            data.room_no = event['r']
+        elif kind == 'item':
+            data = self.tables.sessions.get(label)
+            if data is None or data.bill_no != event['b']:
+                data = self.tables.restore(label, event['b'])
+            line = tuple(event['i'])
+            data.items_list.append(line)
+            data.grand_total += line[3]
+
+    # Shortest event list that rebuilds every open order.
+    def snapshot(self):
+        for data in self.tables.active():
+            yield from self.session_events(data)
+
+    def session_events(self, data):
+        if data.customer_name:
+            yield {'e': 'bill', 't': data.table_num, 'b': data.bill_no,
+                   'n': data.customer_name, 'c': data.customer_contact}
+        if data.room_no:
+            yield {'e': 'room', 't': data.table_num, 'b': data.bill_no, 'r': data.room_no}
+        for line in data.items_list:
+            yield {'e': 'item', 't': data.table_num, 'b': data.bill_no, 'i': line}
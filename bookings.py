@@ -0,0 +1,177 @@
+import threading
+from datetime import date
+
+import db
+import folio
+import guests
+import instrument
+from availability import AvailabilityIndex, parse_stay
+from db import DB_FILE
+from migrations import ISO_DATE_GLOB
+
+# Raised for a booking id that is not (or no longer) in occupants.
+class UnknownBooking(ValueError):
+    pass
+
+
+OCCUPANT_FIELDS = "room_no, name, contact_no, address, gender, checkin_date, checkout_date"
+
+# Authoritative overlap check inside the write transaction, in case another
+# process booked the room after our in-memory index was loaded.
+OVERLAP_SQL = """SELECT checkin_date, checkout_date FROM occupants
+    WHERE room_no = ? AND id != ? AND checkin_date < ? AND checkout_date > ?
+    LIMIT 1"""
+
+# Copies occupants rows into stay_history; the caller deletes them after.
+HISTORY_SQL = f"""INSERT INTO stay_history (id, {OCCUPANT_FIELDS}, guest_id, booked_checkout_date, reason)
+    SELECT id, {OCCUPANT_FIELDS}, guest_id, checkout_date, ? FROM occupants"""
+
+
+# Moves the occupants rows matching `where` into stay_history inside an open
+# transaction. Returns how many were moved.
+def move_to_history(conn, reason, where, params=()):
+    conn.execute(f"{HISTORY_SQL} WHERE {where}", (reason,) + tuple(params))
+    return conn.execute(f"DELETE FROM occupants WHERE {where}", params).rowcount
+
+
+# Retention: stays that ended before `before` (default today) leave the
+# occupants table, keeping it and the availability index small. Only ISO
+# dates compare correctly as strings, so anything else stays put.
+def archive_completed_stays(before=None, path=DB_FILE):
+    before = (before or date.today()).isoformat()
+    where = "checkout_date < ? AND checkout_date GLOB ?"
+    with db.transaction(path) as conn:
+        folio.settle_before(conn, before)
+        return move_to_history(conn, 'checked_out', where, (before, ISO_DATE_GLOB))
+
+
+# Headless room booking: validation, overlap checks and occupant writes.
+# details.py is the Tkinter front end for this class. rooms is anything
+# supporting `in` and iteration over room numbers, e.g. a RoomCatalog.
+# The lock makes the overlap check and the write one step, and keeps the
+# index consistent when writes run on a background thread or an API worker.
+class RoomBookings:
+    def __init__(self, rooms, path=DB_FILE):
+        self.rooms = rooms
+        self.path = path
+        self.lock = threading.RLock()
+        self.guests = guests.directory(path)
+        self.reload()
+
+    @instrument.timed("bookings.reload")
+    def reload(self):
+        with db.connection(self.path) as conn:
+            rows = conn.execute("SELECT id, room_no, checkin_date, checkout_date FROM occupants").fetchall()
+        self.index = AvailabilityIndex.from_rows(rows)
+
+    def validate(self, room_no, name, contact, gender, checkin, checkout):
+        if not all([room_no, name, contact, gender, checkin, checkout]):
+            raise ValueError("All fields are required!")
+        if not guests.valid_contact(contact):
+            raise ValueError("Contact must be 10 digits!")
+        if room_no not in self.rooms:
+            raise ValueError(f"Invalid room number {room_no}!")
+        return parse_stay(checkin, checkout)
+
+    def check_free(self, conn, room_no, start, end, occ_id=None):
+        stay = self.index.conflict(room_no, start, end, ignore=occ_id)
+        if stay is None:
+            stay = conn.execute(OVERLAP_SQL, (room_no, occ_id or 0, end.isoformat(), start.isoformat())).fetchone()
+            if stay is not None:
+                # Booked by another process since our index was loaded.
+                self.reload()
+        if stay is not None:
+            raise ValueError(f"Room {room_no} is already booked from {stay[0]} to {stay[1]}!")
+
+    @instrument.timed("bookings.add_occupant")
+    def add_occupant(self, room_no, name, contact, address, gender, checkin, checkout):
+        room_no, name, contact = room_no.strip(), name.strip(), guests.normalize_contact(contact)
+        start, end = self.validate(room_no, name, contact, gender, checkin.strip(), checkout.strip())
+        with self.lock:
+            with db.transaction(self.path) as conn:
+                self.check_free(conn, room_no, start, end)
+                guest_id = self.guests.record(conn, contact, name, address.strip(), gender, start.isoformat())
+                occ_id = conn.execute(f"INSERT INTO occupants ({OCCUPANT_FIELDS}, guest_id) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                                      (room_no, name, contact, address.strip(), gender,
+                                       start.isoformat(), end.isoformat(), guest_id)).lastrowid
+                folio.post_stay(conn, occ_id, room_no, start, end)
+            self.index.add(occ_id, room_no, start, end)
+        return occ_id
+
+    @instrument.timed("bookings.edit_occupant")
+    def edit_occupant(self, occ_id, room_no, name, contact, address, gender, checkin, checkout):
+        occ_id = int(occ_id)
+        room_no, name, contact = room_no.strip(), name.strip(), guests.normalize_contact(contact)
+        start, end = self.validate(room_no, name, contact, gender, checkin.strip(), checkout.strip())
+        with self.lock:
+            with db.transaction(self.path) as conn:
+                self.check_free(conn, room_no, start, end, occ_id)
+                guest_id = self.guests.record(conn, contact, name, address.strip(), gender, start.isoformat())
+                updated = conn.execute("""UPDATE occupants SET
+                    room_no=?, name=?, contact_no=?, address=?, gender=?, checkin_date=?, checkout_date=?,
+                    guest_id=? WHERE id=?""", (room_no, name, contact, address.strip(), gender,
+                                               start.isoformat(), end.isoformat(), guest_id, occ_id)).rowcount
+                if not updated:
+                    raise UnknownBooking(f"No booking with id {occ_id}")
+                folio.post_stay(conn, occ_id, room_no, start, end)
+            self.index.add(occ_id, room_no, start, end)
+
+    # Moves the booking to stay_history and settles its folio. Returns the
+    # room the occupant was in, or None if they were not booked.
+    def end_stay(self, occ_id, reason, checkout=None):
+        occ_id = int(occ_id)
+        with self.lock:
+            with db.transaction(self.path) as conn:
+                row = conn.execute("SELECT room_no FROM occupants WHERE id = ?", (occ_id,)).fetchone()
+                if row is not None:
+                    move_to_history(conn, reason, "id = ?", (occ_id,))
+                    if checkout is not None:
+                        # Leaving before arrival is a cancellation.
+                        conn.execute("""UPDATE stay_history SET
+                            checkout_date = MAX(checkin_date, MIN(?, checkout_date)),
+                            reason = CASE WHEN ? <= checkin_date THEN 'cancelled' ELSE reason END
+                            WHERE id = ?""", (checkout, checkout, occ_id))
+                    stay = conn.execute("SELECT checkin_date, checkout_date, reason FROM stay_history WHERE id = ?",
+                                        (occ_id,)).fetchone()
+                    folio.settle(conn, occ_id, folio.nights(stay[0], stay[1]) if stay[2] in folio.STAYED else 0)
+            self.index.remove(occ_id)
+        return row[0] if row else None
+
+    @instrument.timed("bookings.delete_occupant")
+    def delete_occupant(self, occ_id):
+        return self.end_stay(occ_id, 'deleted')
+
+    # Guest leaves before their booked check-out date; frees the room and
+    # records today as their check-out in stay_history.
+    @instrument.timed("bookings.early_checkout")
+    def early_checkout(self, occ_id, day=None):
+        return self.end_stay(occ_id, 'early_checkout', (day or date.today()).isoformat())
+
+    @instrument.timed("bookings.free_rooms")
+    def free_rooms(self, checkin, checkout):
+        start, end = parse_stay(checkin, checkout)
+        with self.lock:
+            return self.index.free_rooms(self.rooms, start, end)
+
+    # One page of the occupants list in id order, starting after after_id.
+    def occupant_page(self, after_id=None, limit=200):
+        with db.connection(self.path) as conn:
+            return conn.execute("SELECT * FROM occupants WHERE id > ? ORDER BY id LIMIT ?",
+                                (after_id or 0, limit)).fetchall()
+
+    # {room_no: (name, gender, checkin, checkout)} for rooms occupied on day.
+    @instrument.timed("bookings.current_occupants")
+    def current_occupants(self, day=None, rooms=None):
+        ids = {}
+        with self.lock:
+            for room_no in rooms or self.rooms:
+                occ_id = self.index.occupant_on(room_no, day)
+                if occ_id is not None:
+                    ids[occ_id] = room_no
+        if not ids:
+            return {}
+        marks = ", ".join("?" * len(ids))
+        with db.connection(self.path) as conn:
+            rows = conn.execute(f"""SELECT id, name, gender, checkin_date, checkout_date
+                FROM occupants WHERE id IN ({marks})""", list(ids)).fetchall()
+        return {ids[row[0]]: tuple(v or "" for v in row[1:]) for row in rows}
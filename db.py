@@ -0,0 +1,148 @@
+import queue
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+import instrument
+
+DB_FILE = 'hotel.db'
+POOL_SIZE = 4
+BUSY_TIMEOUT_MS = 5000
+
+# WAL lets the billing and room windows (or processes) write without
+# blocking readers; NORMAL sync is safe under WAL and avoids an fsync per commit.
+PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}",
+    "PRAGMA cache_size=-16000",
+    "PRAGMA mmap_size=268435456",
+    "PRAGMA temp_store=MEMORY",
+)
+
+
+# Records the latency of every execute/executemany in instrument's
+# histograms and logs slow statements with their query plan. Time for
+# SELECTs covers running the statement up to its first row.
+class TimedConnection(sqlite3.Connection):
+    def execute(self, sql, params=()):
+        start = time.perf_counter()
+        try:
+            return super().execute(sql, params)
+        finally:
+            self.record(sql, params, start)
+
+    def executemany(self, sql, seq_of_params):
+        start = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_params)
+        finally:
+            self.record(sql, None, start)
+
+    def commit(self):
+        start = time.perf_counter()
+        try:
+            return super().commit()
+        finally:
+            instrument.record("sql COMMIT", (time.perf_counter() - start) * 1000)
+
+    def record(self, sql, params, start):
+        ms = (time.perf_counter() - start) * 1000
+        instrument.record(instrument.query_name(sql), ms)
+        if ms >= instrument.SLOW_QUERY_MS:
+            instrument.slow_query(self, sql, params, ms)
+
+
+def open_connection(path=DB_FILE):
+    conn = sqlite3.connect(path, timeout=BUSY_TIMEOUT_MS / 1000, check_same_thread=False,
+                           factory=TimedConnection)
+    for pragma in PRAGMAS:
+        conn.execute(pragma)
+    return conn
+
+
+# Fixed-size pool of tuned connections. A connection is only ever used by the
+# thread that acquired it, so sharing it across threads is safe.
+class ConnectionPool:
+    def __init__(self, path=DB_FILE, size=POOL_SIZE):
+        self.path = path
+        self.size = size
+        self.idle = queue.LifoQueue()
+        self.created = 0
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        try:
+            return self.idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self.lock:
+            if self.created < self.size:
+                self.created += 1
+                try:
+                    return open_connection(self.path)
+                except Exception:
+                    self.created -= 1
+                    raise
+        return self.idle.get()
+
+    def release(self, conn):
+        if conn.in_transaction:
+            conn.rollback()
+        self.idle.put(conn)
+
+    @contextmanager
+    def connection(self):
+        conn = self.acquire()
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    # Commits through conn.commit() rather than `with conn`, so the commit
+    # is timed by TimedConnection.
+    @contextmanager
+    def transaction(self):
+        with self.connection() as conn:
+            try:
+                yield conn
+            except BaseException:
+                conn.rollback()
+                raise
+            conn.commit()
+
+    def close(self):
+        with self.lock:
+            while True:
+                try:
+                    self.idle.get_nowait().close()
+                except queue.Empty:
+                    break
+                self.created -= 1
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(path=DB_FILE):
+    with _pools_lock:
+        if path not in _pools:
+            _pools[path] = ConnectionPool(path)
+        return _pools[path]
+
+
+def connection(path=DB_FILE):
+    return get_pool(path).connection()
+
+
+def transaction(path=DB_FILE):
+    return get_pool(path).transaction()
+
+
+def close_pool(path=DB_FILE):
+    with _pools_lock:
+        pool = _pools.pop(path, None)
+    if pool:
+        pool.close()
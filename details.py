@@ -1,279 +1,392 @@
 import tkinter as tk
 from tkinter import ttk
 from tkinter import messagebox
-import sqlite3
 
-DB_FILE = 'hotel.db'
+import db
+import folio
+import instrument
+import migrations
+from bookings import RoomBookings
+from diagnostics import open_panel
+from db import DB_FILE
+from rooms import HOUSEKEEPING_STATUSES, RoomCatalog
+from search import CATEGORIES, search_occupants
+from treesync import TreeSync, PagedTreeSync
+from writer import BackgroundWriter
+
+SEARCH_PLACEHOLDER = "Search by ID / Room / Name"
+SEARCH_DELAY_MS = 250
 
 def connect_db():
-    conn = sqlite3.connect(DB_FILE)
-    cur = conn.cursor()
-    cur.execute('''
-        CREATE TABLE IF NOT EXISTS occupants (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            room_no TEXT NOT NULL,
-            name TEXT,
-            contact_no TEXT,
-            address TEXT,
-            gender TEXT,
-            checkin_date TEXT,
-            checkout_date TEXT
-        )
-    ''')
-    conn.commit()
-    return conn, cur
-
-def close_db(conn):
-    if conn:
-        conn.close()
-
-
-# MAIN 
-win = tk.Tk()
-win.title("Hotel Management System")
-win.geometry("1450x800+10+10")
-
-
-# ROOMS LIST
-
-ROOMS = ["101", "102", "103", "104", "105", "106"]
-PRICE_PER_DAY = "2500"
-CLEAN_STATUS = "Clean"
-
-connection, cursor = connect_db()
-
-
-# ROOM STATUS 
-
-def refresh_room_status():
-    for item in room_tree.get_children():
-        room_tree.delete(item)
-
-    # Fetch current occupants
-    cursor.execute("SELECT room_no, name, gender, checkin_date, checkout_date FROM occupants")
-    occupied = {}
-    for row in cursor.fetchall():
-        room_no = str(row[0]).strip()  # Ensure it's string and clean
-        occupied[room_no] = (row[1] or "", row[2] or "", row[3] or "", row[4] or "")
-
-    for i, room_no in enumerate(ROOMS):
-        if room_no in occupied:
-            name, gender, checkin, checkout = occupied[room_no]
+    migrations.migrate(DB_FILE)
+
+def close_db():
+    db.close_pool(DB_FILE)
+
+
+# One room catalog and booking index per database for the whole process,
+# so reopening the window does not reload them.
+_bookings = {}
+
+def shared_bookings(path=DB_FILE):
+    if path not in _bookings:
+        _bookings[path] = RoomBookings(RoomCatalog(path), path)
+    return _bookings[path]
+
+
+class RoomManagement:
+    def __init__(self, win, path=DB_FILE):
+        self.win = win
+        self.path = path
+        self.win.title("Hotel Management System")
+        self.win.geometry("1450x800+10+10")
+        self.win.bind("<F12>", lambda e: open_panel(self.win))
+
+        # ROOMS LIST (cached from the rooms table)
+        self.bookings = shared_bookings(path)
+        self.catalog = self.bookings.rooms
+        self.search_job = None
+        # Occupant writes run on a background thread; see writer.py.
+        self.writer = BackgroundWriter(self.win, name="rooms-writer")
+        self.win.protocol("WM_DELETE_WINDOW", self.on_close)
+
+        tk.Label(win, text="Hotel Management System", font=("Arial", 32, "bold"), bg="#2c3e50", fg="white", pady=20).pack(fill=tk.X)
+
+        # Search Bar
+        search_fr = tk.Frame(win)
+        search_fr.pack(pady=10)
+        self.search_entry = tk.Entry(search_fr, font=("Arial", 14), width=40, fg="grey")
+        self.search_entry.pack(side=tk.LEFT, padx=10)
+        self.search_entry.insert(0, SEARCH_PLACEHOLDER)
+        self.search_entry.bind("<FocusIn>", lambda e: self.search_entry.delete(0, tk.END) if "Search" in self.search_entry.get() else None)
+        self.search_entry.bind("<KeyRelease>", self.schedule_search)
+        self.search_entry.bind("<Return>", self.run_search)
+
+        self.category_combobox = ttk.Combobox(search_fr, values=CATEGORIES, state="readonly")
+        self.category_combobox.pack(side=tk.LEFT, padx=5)
+        self.category_combobox.set("Room No")
+        self.category_combobox.bind("<<ComboboxSelected>>", self.run_search)
+
+        tk.Button(search_fr, text="Search", bg="#e67e22", fg="white", font=("Arial", 12), command=self.run_search).pack(side=tk.LEFT, padx=5)
+
+        # Main Layout
+        main = tk.Frame(win)
+        main.pack(fill=tk.BOTH, expand=True, padx=20, pady=10)
+
+        # Left: Form
+        left = tk.LabelFrame(main, text=" Enter Occupant Details ", font=("Arial", 16), padx=20, pady=20)
+        left.pack(side=tk.LEFT, fill=tk.Y, padx=(0, 15))
+
+        self.room_ent = tk.Entry(left, font=14)
+        self.name_ent = tk.Entry(left, font=14)
+        self.contact_ent = tk.Entry(left, font=14)
+        self.address_ent = tk.Entry(left, font=14)
+        self.gender_combobox = ttk.Combobox(left, values=["Male","Female","Others"], state="readonly", font=14)
+        self.entry_checkin = tk.Entry(left, font=14)
+        self.entry_checkout = tk.Entry(left, font=14)
+        fields = [
+            ("Room No", self.room_ent),
+            ("Name", self.name_ent),
+            ("Contact No", self.contact_ent),
+            ("Address", self.address_ent),
+            ("Gender", self.gender_combobox),
+            ("Check-In Date", self.entry_checkin),
+            ("Check-Out Date", self.entry_checkout),
+        ]
+        for i, (txt, w) in enumerate(fields):
+            tk.Label(left, text=txt, font=("Arial", 14)).grid(row=i, column=0, sticky="w", pady=10)
+            w.grid(row=i, column=1, sticky="ew", pady=10, padx=10)
+        left.grid_columnconfigure(1, weight=1)
+        self.contact_ent.bind("<KeyRelease>", self.fill_guest)
+
+        tk.Button(left, text="Find Free Rooms", bg="#8e44ad", fg="white", command=self.show_free_rooms).grid(row=7, column=0, columnspan=2, pady=(10, 0), padx=20, sticky="ew")
+
+        self.add_btn = tk.Button(left, text="Add Occupant", font=("Arial", 16, "bold"), bg="#27ae60", fg="white", command=self.add_occupant)
+        self.add_btn.grid(row=8, column=0, columnspan=2, pady=20, padx=20, sticky="ew")
+
+        self.edit_btn = tk.Button(left, text="Edit", bg="#2980b9", fg="white", command=self.edit_occupant)
+        self.del_btn = tk.Button(left, text="Delete", bg="#c0392b", fg="white", command=self.delete_occupant)
+        self.checkout_btn = tk.Button(left, text="Early Check-Out", font=("Arial", 16, "bold"), bg="#e74c3c", fg="white", command=self.early_checkout)
+
+        # Right: Tables
+        right = tk.Frame(main)
+        right.pack(side=tk.RIGHT, fill=tk.BOTH, expand=True)
+
+        # All Occupants
+        tree_fr = tk.LabelFrame(right, text=" All Occupants ", font=("Arial", 14))
+        tree_fr.pack(fill=tk.BOTH, expand=True, pady=(0,10))
+        self.tree = ttk.Treeview(tree_fr, columns=("ID","Room","Name","Contact","Address","Gender","In","Out"), show="headings")
+        for c, h in zip(self.tree["columns"], ["ID","Room No","Name","Contact","Address","Gender","Check-In","Check-Out"]):
+            self.tree.heading(c, text=h); self.tree.column(c, width=110, anchor="center")
+        tree_scroll = ttk.Scrollbar(tree_fr, orient=tk.VERTICAL, command=self.tree.yview)
+        tree_scroll.pack(side=tk.RIGHT, fill=tk.Y)
+        self.tree.pack(fill=tk.BOTH, expand=True)
+        self.tree.bind("<<TreeviewSelect>>", self.on_select)
+        self.occupant_sync = PagedTreeSync(self.tree, self.fetch_occupant_page, scrollbar=tree_scroll)
+
+        # Room Status
+        room_fr = tk.LabelFrame(right, text=" Room Status ", font=("Arial", 16))
+        room_fr.pack(fill=tk.BOTH, expand=True)
+        self.room_tree = ttk.Treeview(room_fr, columns=("Room","Type","Status","Price","Clean","Name","Gender","In","Out"), show="headings")
+        headers = ["Room","Type","Status","Price/Day","Cleanliness","Occupant","Gender","Check-In","Check-Out"]
+        for c, h in zip(self.room_tree["columns"], headers):
+            self.room_tree.heading(c, text=h); self.room_tree.column(c, width=120, anchor="center")
+        room_scroll = ttk.Scrollbar(room_fr, orient=tk.VERTICAL, command=self.room_tree.yview)
+        self.room_tree.configure(yscrollcommand=room_scroll.set)
+        housekeeping_fr = tk.Frame(room_fr)
+        housekeeping_fr.pack(side=tk.BOTTOM, fill=tk.X, padx=10, pady=(0, 10))
+        room_scroll.pack(side=tk.RIGHT, fill=tk.Y)
+        self.room_tree.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+        self.room_sync = TreeSync(self.room_tree)
+
+        tk.Label(housekeeping_fr, text="Housekeeping:", font=("Arial", 12)).pack(side=tk.LEFT)
+        self.housekeeping_combobox = ttk.Combobox(housekeeping_fr, values=HOUSEKEEPING_STATUSES, state="readonly")
+        self.housekeeping_combobox.pack(side=tk.LEFT, padx=5)
+        tk.Button(housekeeping_fr, text="Set For Selected Room", bg="#16a085", fg="white", command=self.set_housekeeping).pack(side=tk.LEFT, padx=5)
+
+        # Styling
+        style = ttk.Style()
+        style.theme_use("clam")
+        self.room_tree.tag_configure("occupied", background="#ffebee", foreground="#c62828", font=("Arial", 10, "bold"))
+        self.room_tree.tag_configure("vacant", background="#e8f5e8", foreground="#2e7d32", font=("Arial", 10, "bold"))
+
+        self.view_occupants()
+        self.refresh_room_status()
+        self.reset_buttons()
+
+    def room_row(self, room_no, occupant):
+        room = self.catalog.get(room_no)
+        if occupant:
+            name, gender, checkin, checkout = occupant
             status = "Occupied"
             tag = "occupied"
         else:
             name = gender = checkin = checkout = ""
             status = "Vacant"
             tag = "vacant"
-
-        room_tree.insert("", "end", values=(
+        return room_no, (
             room_no,
+            room.room_type,
             status,
-            PRICE_PER_DAY,
-            CLEAN_STATUS,
+            f"{room.price_per_day:g}" if room.price_per_day is not None else "",
+            room.status,
             name,
             gender,
             checkin,
             checkout
-        ), tags=(tag,))
-
-def add_occupant():
-    room_no = room_ent.get().strip()
-    name = name_ent.get().strip()
-    contact = contact_ent.get().strip()
-    address = address_ent.get().strip()
-    gender = gender_combobox.get()
-    checkin = entry_checkin.get().strip()
-    checkout = entry_checkout.get().strip()
-
-    if not all([room_no, name, contact, gender, checkin, checkout]):
-        messagebox.showerror("Error", "All fields are required!")
-        return
-    if not contact.isdigit() or len(contact) != 10:
-        messagebox.showerror("Error", "Contact must be 10 digits!")
-        return
-    if room_no not in ROOMS:
-        messagebox.showerror("Error", f"Invalid room number! Use: {', '.join(ROOMS)}")
-        return
-
-    # Prevent double booking
-    cursor.execute("SELECT id FROM occupants WHERE room_no = ?", (room_no,))
-    if cursor.fetchone():
-        messagebox.showerror("Error", f"Room {room_no} is already occupied!")
-        return
-
-    cursor.execute("""INSERT INTO occupants 
-        (room_no, name, contact_no, address, gender, checkin_date, checkout_date)
-        VALUES (?, ?, ?, ?, ?, ?, ?)""",
-        (room_no, name, contact, address, gender, checkin, checkout))
-    connection.commit()
-
-    view_occupants()
-    clear_entries()
-    refresh_room_status()
-    reset_buttons()
-    messagebox.showinfo("Success", f"Room {room_no} booked for {name}!")
-
-def view_occupants():
-    for i in tree.get_children():
-        tree.delete(i)
-    cursor.execute("SELECT * FROM occupants")
-    for row in cursor.fetchall():
-        tree.insert("", "end", values=row)
-
-def clear_entries():
-    for w in [room_ent, name_ent, contact_ent, address_ent, entry_checkin, entry_checkout]:
-        w.delete(0, tk.END)
-    gender_combobox.set("")
-
-def reset_buttons():
-    edit_btn.grid_forget()
-    del_btn.grid_forget()
-    checkout_btn.grid_forget()
-    add_btn.grid(row=8, column=0, columnspan=2, pady=20, padx=20, sticky="ew")
-
-def on_select(event):
-    sel = tree.selection()
-    if not sel:
-        reset_buttons()
-        clear_entries()
-        return
-
-    values = tree.item(sel[0], "values")
-    clear_entries()
-    room_ent.insert(0, values[1])
-    name_ent.insert(0, values[2])
-    contact_ent.insert(0, values[3])
-    address_ent.insert(0, values[4])
-    gender_combobox.set(values[5])
-    entry_checkin.insert(0, values[6])
-    entry_checkout.insert(0, values[7])
-
-    add_btn.grid_forget()
-    edit_btn.grid(row=9, column=0, pady=5, padx=10, sticky="ew")
-    del_btn.grid(row=9, column=1, pady=5, padx=10, sticky="ew")
-    checkout_btn.grid(row=10, columnspan=2, pady=15, padx=20, sticky="ew")
-
-def edit_occupant():
-    sel = tree.selection()
-    if not sel: return
-    occ_id = tree.item(sel[0], "values")[0]
-    cursor.execute("""UPDATE occupants SET 
-        room_no=?, name=?, contact_no=?, address=?, gender=?, checkin_date=?, checkout_date=?
-        WHERE id=?""", (
-        room_ent.get().strip(), name_ent.get().strip(), contact_ent.get().strip(),
-        address_ent.get().strip(), gender_combobox.get(),
-        entry_checkin.get().strip(), entry_checkout.get().strip(), occ_id
-    ))
-    connection.commit()
-    view_occupants()
-    refresh_room_status()
-    reset_buttons()
-    messagebox.showinfo("Success", "Record updated!")
-
-def delete_occupant():
-    sel = tree.selection()
-    if not sel or not messagebox.askyesno("Delete", "Delete this record permanently?"):
-        return
-    cursor.execute("DELETE FROM occupants WHERE id=?", (tree.item(sel[0], "values")[0],))
-    connection.commit()
-    view_occupants()
-    refresh_room_status()
-    reset_buttons()
-
-def early_checkout():
-    sel = tree.selection()
-    if not sel:
-        messagebox.showerror("Error", "Please select a guest!")
-        return
-    values = tree.item(sel[0], "values")
-    name, room = values[2], values[1]
-    if messagebox.askyesno("Early Check-Out", f"Check out {name} from Room {room}?"):
-        cursor.execute("DELETE FROM occupants WHERE id=?", (values[0],))
-        connection.commit()
-        messagebox.showinfo("Success", f"{name} checked out!\nRoom {room} is now VACANT.")
-        view_occupants()
-        clear_entries()
-        refresh_room_status()
-        reset_buttons()
-
-
-tk.Label(win, text="Hotel Management System", font=("Arial", 32, "bold"), bg="#2c3e50", fg="white", pady=20).pack(fill=tk.X)
-
-# Search Bar
-search_fr = tk.Frame(win)
-search_fr.pack(pady=10)
-tk.Entry(search_fr, font=("Arial", 14), width=40, fg="grey").pack(side=tk.LEFT, padx=10)
-search_entry = search_fr.winfo_children()[0]
-search_entry.insert(0, "Search by ID / Room / Name")
-search_entry.bind("<FocusIn>", lambda e: search_entry.delete(0, tk.END) if "Search" in search_entry.get() else None)
-
-ttk.Combobox(search_fr, values=["ID", "Room No", "Name"], state="readonly").pack(side=tk.LEFT, padx=5)
-category_combobox = search_fr.winfo_children()[1]
-category_combobox.set("Room No")
-
-tk.Button(search_fr, text="Search", bg="#e67e22", fg="white", font=("Arial", 12)).pack(side=tk.LEFT, padx=5)
-
-# Main Layout
-main = tk.Frame(win)
-main.pack(fill=tk.BOTH, expand=True, padx=20, pady=10)
-
-# Left: Form
-left = tk.LabelFrame(main, text=" Enter Occupant Details ", font=("Arial", 16), padx=20, pady=20)
-left.pack(side=tk.LEFT, fill=tk.Y, padx=(0, 15))
-
-fields = [
-    ("Room No", room_ent := tk.Entry(left, font=14)),
-    ("Name", name_ent := tk.Entry(left, font=14)),
-    ("Contact No", contact_ent := tk.Entry(left, font=14)),
-    ("Address", address_ent := tk.Entry(left, font=14)),
-    ("Gender", gender_combobox := ttk.Combobox(left, values=["Male","Female","Others"], state="readonly", font=14)),
-    ("Check-In Date", entry_checkin := tk.Entry(left, font=14)),
-    ("Check-Out Date", entry_checkout := tk.Entry(left, font=14)),
-]
-for i, (txt, w) in enumerate(fields):
-    tk.Label(left, text=txt, font=("Arial", 14)).grid(row=i, column=0, sticky="w", pady=10)
-    w.grid(row=i, column=1, sticky="ew", pady=10, padx=10)
-left.grid_columnconfigure(1, weight=1)
-
-add_btn = tk.Button(left, text="Add Occupant", font=("Arial", 16, "bold"), bg="#27ae60", fg="white", command=add_occupant)
-add_btn.grid(row=8, column=0, columnspan=2, pady=20, padx=20, sticky="ew")
-
-edit_btn = tk.Button(left, text="Edit", bg="#2980b9", fg="white", command=edit_occupant)
-del_btn = tk.Button(left, text="Delete", bg="#c0392b", fg="white", command=delete_occupant)
-checkout_btn = tk.Button(left, text="Early Check-Out", font=("Arial", 16, "bold"), bg="#e74c3c", fg="white", command=early_checkout)
-
-# Right: Tables
-right = tk.Frame(main)
-right.pack(side=tk.RIGHT, fill=tk.BOTH, expand=True)
-
-# All Occupants
-tree_fr = tk.LabelFrame(right, text=" All Occupants ", font=("Arial", 14))
-tree_fr.pack(fill=tk.BOTH, expand=True, pady=(0,10))
-tree = ttk.Treeview(tree_fr, columns=("ID","Room","Name","Contact","Address","Gender","In","Out"), show="headings")
-for c, h in zip(tree["columns"], ["ID","Room No","Name","Contact","Address","Gender","Check-In","Check-Out"]):
-    tree.heading(c, text=h); tree.column(c, width=110, anchor="center")
-tree.pack(fill=tk.BOTH, expand=True)
-tree.bind("<<TreeviewSelect>>", on_select)
-
-# Room Status
-room_fr = tk.LabelFrame(right, text=" Room Status ", font=("Arial", 16))
-room_fr.pack(fill=tk.BOTH, expand=True)
-room_tree = ttk.Treeview(room_fr, columns=("Room","Status","Price","Clean","Name","Gender","In","Out"), show="headings")
-headers = ["Room","Status","Price/Day","Cleanliness","Occupant","Gender","Check-In","Check-Out"]
-for c, h in zip(room_tree["columns"], headers):
-    room_tree.heading(c, text=h); room_tree.column(c, width=130, anchor="center")
-room_tree.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
-
-# Styling
-style = ttk.Style()
-style.theme_use("clam")
-room_tree.tag_configure("occupied", background="#ffebee", foreground="#c62828", font=("Arial", 10, "bold"))
-room_tree.tag_configure("vacant", background="#e8f5e8", foreground="#2e7d32", font=("Arial", 10, "bold"))
-
-view_occupants()
-refresh_room_status()
-reset_buttons()
-
-win.mainloop()
-close_db(connection)
+        ), (tag,)
+
+    @instrument.timed("rooms_ui.refresh_room_status")
+    def refresh_room_status(self):
+        self.catalog.ensure_fresh()
+        # Occupants staying today, found through the availability index
+        occupied = self.bookings.current_occupants()
+        self.room_sync.sync(self.room_row(room_no, occupied.get(room_no)) for room_no in self.catalog)
+
+    # Re-reads a single room and updates its row only.
+    @instrument.timed("rooms_ui.refresh_room")
+    def refresh_room(self, room_no):
+        room_no = str(room_no).strip()
+        if room_no not in self.catalog:
+            return
+        occupant = self.bookings.current_occupants(rooms=[room_no]).get(room_no)
+        self.room_sync.upsert(*self.room_row(room_no, occupant))
+
+    def on_close(self):
+        self.writer.close()
+        self.win.destroy()
+
+    # Runs a booking write on the writer thread with the form's buttons
+    # disabled until it finishes; errors are shown like before.
+    def submit_write(self, fn, args, on_done):
+        buttons = (self.add_btn, self.edit_btn, self.del_btn, self.checkout_btn)
+        for btn in buttons:
+            btn.config(state="disabled")
+
+        def finish(result, error=None):
+            for btn in buttons:
+                btn.config(state="normal")
+            if error is not None:
+                messagebox.showerror("Error", str(error), parent=self.win)
+            else:
+                on_done(result)
+        self.writer.submit(fn, args, on_done=finish, on_error=lambda e: finish(None, e))
+
+    def add_occupant(self):
+        room_no = self.room_ent.get().strip()
+        name = self.name_ent.get().strip()
+
+        def done(occ_id):
+            self.refresh_occupant(occ_id)
+            self.clear_entries()
+            self.refresh_room(room_no)
+            self.reset_buttons()
+            messagebox.showinfo("Success", f"Room {room_no} booked for {name}!", parent=self.win)
+
+        # Validates the form and prevents overlapping bookings
+        self.submit_write(self.bookings.add_occupant, self.form_values(), done)
+
+    def fetch_occupant_page(self, after_id, limit):
+        return [(row[0], row, ()) for row in self.bookings.occupant_page(after_id, limit)]
+
+    @instrument.timed("rooms_ui.view_occupants")
+    def view_occupants(self):
+        self.occupant_sync.reload()
+
+    # Re-reads one occupant by primary key and updates, adds or drops its row.
+    @instrument.timed("rooms_ui.refresh_occupant")
+    def refresh_occupant(self, occ_id):
+        occ_id = int(occ_id)
+        with db.connection(self.path) as conn:
+            row = conn.execute("SELECT * FROM occupants WHERE id = ?", (occ_id,)).fetchone()
+        if row:
+            self.occupant_sync.upsert(occ_id, row)
+        else:
+            self.occupant_sync.remove(occ_id)
+
+    @instrument.timed("rooms_ui.run_search")
+    def run_search(self, event=None):
+        if self.search_job is not None:
+            self.win.after_cancel(self.search_job)
+            self.search_job = None
+        text = self.search_entry.get().strip()
+        if not text or text == SEARCH_PLACEHOLDER:
+            self.view_occupants()
+            return
+        rows = search_occupants(self.category_combobox.get(), text, self.path)
+        self.occupant_sync.show((row[0], row, ()) for row in rows)
+
+    # Search-as-you-type: wait for a short pause in typing before querying.
+    def schedule_search(self, event=None):
+        if self.search_job is not None:
+            self.win.after_cancel(self.search_job)
+        self.search_job = self.win.after(SEARCH_DELAY_MS, self.run_search)
+
+    def form_values(self):
+        return (self.room_ent.get(), self.name_ent.get(), self.contact_ent.get(), self.address_ent.get(),
+                self.gender_combobox.get(), self.entry_checkin.get(), self.entry_checkout.get())
+
+    # Repeat guest: once the contact number is complete, fill in whatever
+    # name, address and gender the clerk has not typed yet.
+    def fill_guest(self, event=None):
+        guest = self.bookings.guests.lookup(self.contact_ent.get())
+        if guest is None:
+            return
+        for entry, value in ((self.name_ent, guest.name), (self.address_ent, guest.address)):
+            if value and not entry.get().strip():
+                entry.insert(0, value)
+        if guest.gender and not self.gender_combobox.get():
+            self.gender_combobox.set(guest.gender)
+
+    def show_free_rooms(self):
+        try:
+            free = self.bookings.free_rooms(self.entry_checkin.get(), self.entry_checkout.get())
+        except ValueError as e:
+            messagebox.showerror("Error", str(e), parent=self.win)
+            return
+        if free:
+            messagebox.showinfo("Free Rooms", f"Free for these dates: {', '.join(free)}", parent=self.win)
+        else:
+            messagebox.showinfo("Free Rooms", "No rooms are free for these dates.", parent=self.win)
+
+    def set_housekeeping(self):
+        sel = self.room_tree.selection()
+        status = self.housekeeping_combobox.get()
+        if not sel or not status:
+            messagebox.showerror("Error", "Select a room and a housekeeping status!", parent=self.win)
+            return
+        try:
+            self.catalog.set_status(sel[0], status)
+        except ValueError as e:
+            messagebox.showerror("Error", str(e), parent=self.win)
+            return
+        self.refresh_room(sel[0])
+
+    def clear_entries(self):
+        for w in [self.room_ent, self.name_ent, self.contact_ent, self.address_ent, self.entry_checkin, self.entry_checkout]:
+            w.delete(0, tk.END)
+        self.gender_combobox.set("")
+
+    def reset_buttons(self):
+        self.edit_btn.grid_forget()
+        self.del_btn.grid_forget()
+        self.checkout_btn.grid_forget()
+        self.add_btn.grid(row=8, column=0, columnspan=2, pady=20, padx=20, sticky="ew")
+
+    @instrument.timed("rooms_ui.on_select")
+    def on_select(self, event):
+        sel = self.tree.selection()
+        if not sel:
+            self.reset_buttons()
+            self.clear_entries()
+            return
+
+        values = self.tree.item(sel[0], "values")
+        self.clear_entries()
+        self.room_ent.insert(0, values[1])
+        self.name_ent.insert(0, values[2])
+        self.contact_ent.insert(0, values[3])
+        self.address_ent.insert(0, values[4])
+        self.gender_combobox.set(values[5])
+        self.entry_checkin.insert(0, values[6])
+        self.entry_checkout.insert(0, values[7])
+
+        self.add_btn.grid_forget()
+        self.edit_btn.grid(row=9, column=0, pady=5, padx=10, sticky="ew")
+        self.del_btn.grid(row=9, column=1, pady=5, padx=10, sticky="ew")
+        self.checkout_btn.grid(row=10, columnspan=2, pady=15, padx=20, sticky="ew")
+
+    def edit_occupant(self):
+        sel = self.tree.selection()
+        if not sel: return
+        occ_id, old_room = self.tree.item(sel[0], "values")[:2]
+        new_room = self.room_ent.get()
+
+        def done(result):
+            self.refresh_occupant(occ_id)
+            self.refresh_room(old_room)
+            self.refresh_room(new_room)
+            self.reset_buttons()
+            messagebox.showinfo("Success", "Record updated!", parent=self.win)
+        self.submit_write(self.bookings.edit_occupant, (occ_id,) + self.form_values(), done)
+
+    def delete_occupant(self):
+        sel = self.tree.selection()
+        if not sel or not messagebox.askyesno("Delete", "Delete this record? It is kept in stay history.", parent=self.win):
+            return
+        occ_id, room = self.tree.item(sel[0], "values")[:2]
+
+        def done(result):
+            self.occupant_sync.remove(occ_id)
+            self.refresh_room(room)
+            self.reset_buttons()
+        self.submit_write(self.bookings.delete_occupant, (occ_id,), done)
+
+    def early_checkout(self):
+        sel = self.tree.selection()
+        if not sel:
+            messagebox.showerror("Error", "Please select a guest!", parent=self.win)
+            return
+        values = self.tree.item(sel[0], "values")
+        name, room = values[2], values[1]
+        if not messagebox.askyesno("Early Check-Out", f"Check out {name} from Room {room}?", parent=self.win):
+            return
+
+        def done(result):
+            stay = folio.get(values[0], self.path)
+            bill = f"\n\n{folio.render_folio(stay)}" if stay else ""
+            messagebox.showinfo("Success", f"{name} checked out!\nRoom {room} is now VACANT.{bill}", parent=self.win)
+            self.occupant_sync.remove(values[0])
+            self.clear_entries()
+            self.refresh_room(room)
+            self.reset_buttons()
+        self.submit_write(self.bookings.early_checkout, (values[0],), done)
+
+
+if __name__ == "__main__":
+    instrument.setup_logging()
+    connect_db()
+    root = tk.Tk()
+    app = RoomManagement(root)
+    root.mainloop()
+    close_db()
@@ -0,0 +1,78 @@
+from tkinter import Toplevel, Frame, Label, Button, Text, Scrollbar, END, ttk
+
+import instrument
+from treesync import TreeSync
+
+REFRESH_MS = 1000
+STAT_COLUMNS = ("Name", "Count", "Mean", "p50", "p95", "p99", "Max")
+
+
+# Live view of instrument's latency histograms and slow-query log. Opened
+# with F12 from the billing and room windows; one panel per application.
+class DiagnosticsPanel:
+    def __init__(self, win):
+        self.win = win
+        self.win.title("Diagnostics")
+        self.win.geometry("900x600")
+
+        Label(self.win, text="Latency (ms)", font=('Arial', 14, 'bold')).pack(anchor='w', padx=10, pady=(10, 0))
+        stats_frame = Frame(self.win)
+        stats_frame.pack(fill='both', expand=True, padx=10, pady=5)
+        self.tree = ttk.Treeview(stats_frame, columns=STAT_COLUMNS, show="headings", height=12)
+        for c in STAT_COLUMNS:
+            self.tree.heading(c, text=c)
+            self.tree.column(c, width=260 if c == "Name" else 80, anchor='w' if c == "Name" else 'e')
+        scroll = Scrollbar(stats_frame, command=self.tree.yview)
+        self.tree.configure(yscrollcommand=scroll.set)
+        scroll.pack(side='right', fill='y')
+        self.tree.pack(fill='both', expand=True)
+        self.stats_sync = TreeSync(self.tree)
+
+        Label(self.win, text=f"Slow queries (over {instrument.SLOW_QUERY_MS} ms)",
+              font=('Arial', 14, 'bold')).pack(anchor='w', padx=10)
+        self.slow_txt = Text(self.win, height=10, font=('Courier', 10), wrap='word')
+        self.slow_txt.pack(fill='both', expand=True, padx=10, pady=5)
+        self.slow_shown = None
+
+        buttons = Frame(self.win)
+        buttons.pack(fill='x', padx=10, pady=(0, 10))
+        Button(buttons, text="Reset", width=12, command=self.reset).pack(side='left')
+        Button(buttons, text="Close", width=12, command=self.win.destroy).pack(side='right')
+
+        self.refresh()
+
+    def refresh(self):
+        if not self.win.winfo_exists():
+            return
+        self.update()
+        self.win.after(REFRESH_MS, self.refresh)
+
+    def update(self):
+        self.stats_sync.sync(
+            (name, (name, count) + tuple(f"{v:.2f}" for v in times), ())
+            for name, count, *times in sorted(instrument.snapshot()))
+        slow = list(instrument.slow_queries)
+        if slow != self.slow_shown:
+            self.slow_shown = slow
+            self.slow_txt.delete('1.0', END)
+            for when, ms, sql, plan in reversed(slow):
+                self.slow_txt.insert(END, f"{when}  {ms:.1f} ms  {sql}\n")
+                for step in plan:
+                    self.slow_txt.insert(END, f"    {step}\n")
+
+    def reset(self):
+        instrument.reset()
+        self.update()
+
+
+_panel = None
+
+
+def open_panel(parent):
+    global _panel
+    if _panel is not None and _panel.win.winfo_exists():
+        _panel.win.deiconify()
+        _panel.win.lift()
+        return _panel
+    _panel = DiagnosticsPanel(Toplevel(parent))
+    return _panel
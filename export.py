@@ -0,0 +1,145 @@
+import argparse
+import csv
+import json
+import os
+import sys
+from multiprocessing import Pool
+
+import db
+import migrations
+from db import DB_FILE
+from receipt import render_bill
+
+CHUNK_SIZE = 500
+CSV_HEADER = ["bill_number", "table_number", "customer_name", "customer_contact", "date",
+              "item_name", "item_quantity", "cost_per_item", "total_cost"]
+
+BILL_SQL = """SELECT id, bill_number, table_number, customer_name, customer_contact, date, total_cost
+    FROM bills"""
+
+
+def chunked(iterable, size):
+    chunk = []
+    for value in iterable:
+        chunk.append(value)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def attach_items(conn, bills):
+    marks = ", ".join("?" * len(bills))
+    items = {}
+    for bill_id, name, qty, cost, total in conn.execute(f"""
+            SELECT bill_id, item_name, item_quantity, cost_per_item, total_cost
+            FROM bill_items WHERE bill_id IN ({marks}) ORDER BY bill_id, id""", [b[0] for b in bills]):
+        items.setdefault(bill_id, []).append((name, qty, cost, total))
+    for bill in bills:
+        yield bill[1:] + (items.get(bill[0], []),)
+
+
+# Streams (bill_number, table, customer, contact, date, total, items) in
+# bill order, CHUNK_SIZE bills at a time: one keyset query for the bills
+# and one for their items per chunk, never the whole table.
+def iter_bills(date_from=None, date_to=None, bill_numbers=None, path=DB_FILE, chunk_size=CHUNK_SIZE):
+    if bill_numbers is not None:
+        for numbers in chunked(bill_numbers, chunk_size):
+            marks = ", ".join("?" * len(numbers))
+            with db.connection(path) as conn:
+                bills = conn.execute(f"{BILL_SQL} WHERE bill_number IN ({marks}) ORDER BY id",
+                                     numbers).fetchall()
+                chunk = list(attach_items(conn, bills)) if bills else []
+            yield from chunk
+        return
+
+    clauses, params = ["id > ?"], []
+    if date_from:
+        clauses.append("date >= ?")
+        params.append(date_from)
+    if date_to:
+        clauses.append("date <= ?")
+        params.append(date_to)
+    sql = f"{BILL_SQL} WHERE {' AND '.join(clauses)} ORDER BY id LIMIT ?"
+    last_id = 0
+    while True:
+        with db.connection(path) as conn:
+            bills = conn.execute(sql, [last_id] + params + [chunk_size]).fetchall()
+            if not bills:
+                return
+            chunk = list(attach_items(conn, bills))
+        yield from chunk
+        last_id = bills[-1][0]
+
+
+def write_csv(out, bills):
+    writer = csv.writer(out)
+    writer.writerow(CSV_HEADER)
+    count = 0
+    for bill_no, table, name, contact, date, total, items in bills:
+        writer.writerows((bill_no, table, name, contact, date) + item for item in items)
+        count += 1
+    return count
+
+
+def write_jsonl(out, bills):
+    count = 0
+    for bill_no, table, name, contact, date, total, items in bills:
+        out.write(json.dumps({
+            'bill_number': bill_no, 'table_number': table, 'customer_name': name,
+            'customer_contact': contact, 'date': date, 'total_cost': total,
+            'items': [dict(zip(CSV_HEADER[5:], item)) for item in items],
+        }) + "\n")
+        count += 1
+    return count
+
+
+def format_receipt(bill):
+    bill_no, table, name, contact, date, total, items = bill
+    return render_bill(table, bill_no, date, name, contact, items, total or 0) + "\f\n"
+
+
+# Receipts are formatted in a process pool one chunk at a time, so every
+# core is used while only a chunk of bills is held in memory.
+def write_receipts(out, bills, workers=None):
+    workers = workers or os.cpu_count() or 1
+    count = 0
+    if workers == 1:
+        for bill in bills:
+            out.write(format_receipt(bill))
+            count += 1
+        return count
+    with Pool(workers) as pool:
+        for chunk in chunked(bills, CHUNK_SIZE * workers):
+            out.writelines(pool.map(format_receipt, chunk, chunksize=64))
+            count += len(chunk)
+    return count
+
+
+WRITERS = {
+    'csv': write_csv,
+    'jsonl': write_jsonl,
+    'receipts': write_receipts,
+}
+
+
+def export(fmt, output, date_from=None, date_to=None, bill_numbers=None, path=DB_FILE):
+    bills = iter_bills(date_from, date_to, bill_numbers, path)
+    with open(output, 'w', newline='' if fmt == 'csv' else None, encoding='utf-8') as out:
+        return WRITERS[fmt](out, bills)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export saved bills")
+    parser.add_argument("format", choices=sorted(WRITERS))
+    parser.add_argument("output")
+    parser.add_argument("--from", dest="date_from", help="first date, YYYY-MM-DD")
+    parser.add_argument("--to", dest="date_to", help="last date, YYYY-MM-DD")
+    parser.add_argument("--bills", help="comma separated bill numbers")
+    args = parser.parse_args()
+
+    numbers = [int(n) for n in args.bills.split(",")] if args.bills else None
+    migrations.migrate(DB_FILE)
+    count = export(args.format, args.output, args.date_from, args.date_to, numbers)
+    print(f"Exported {count} bills to {args.output}", file=sys.stderr)
@@ -0,0 +1,107 @@
+import sys
+from collections import namedtuple
+
+import db
+import migrations
+from availability import parse_date
+from db import DB_FILE
+
+# Reasons a stay ends with the guest having actually stayed; other ended
+# stays (cancelled, deleted) carry no room charges.
+STAYED = ('checked_out', 'early_checkout')
+
+Folio = namedtuple('Folio', 'occupant_id room_no nights rate room_charges restaurant_charges bills balance settled_at')
+FOLIO_COLUMNS = "occupant_id, room_no, nights, rate, room_charges, restaurant_charges, bills, balance, settled_at"
+
+ROOM_RATE_SQL = """SELECT p.price_per_day FROM rooms r
+    JOIN rate_plans p ON p.room_type_id = r.room_type_id AND p.is_default = 1
+    WHERE r.room_no = ?"""
+
+# Room charges only: the restaurant total belongs to the triggers on bills.
+POST_STAY_SQL = """
+    INSERT INTO folios (occupant_id, room_no, nights, rate, room_charges) VALUES (?, ?, ?, ?, ?)
+    ON CONFLICT (occupant_id) DO UPDATE SET
+        room_no = excluded.room_no, nights = excluded.nights,
+        rate = excluded.rate, room_charges = excluded.room_charges
+"""
+
+# Uses idx_occupants_room; the latest arrival wins on a changeover day.
+OCCUPANT_IN_ROOM_SQL = """SELECT id FROM occupants
+    WHERE room_no = ? AND checkin_date <= ? AND checkout_date > ?
+    ORDER BY checkin_date DESC LIMIT 1"""
+
+
+def nights(checkin, checkout):
+    return max(0, (parse_date(checkout) - parse_date(checkin)).days)
+
+
+# Sets a booking's room charges at the room's current rate, inside the
+# booking's transaction. Restaurant charges already posted are kept.
+def post_stay(conn, occ_id, room_no, start, end):
+    row = conn.execute(ROOM_RATE_SQL, (room_no,)).fetchone()
+    rate = row[0] if row else 0.0
+    count = max(0, (end - start).days)
+    conn.execute(POST_STAY_SQL, (occ_id, room_no, count, rate, count * rate))
+
+
+# Makes sure a booking has a folio before bills are posted to it, e.g. one
+# written by an older version or another tool.
+def open_folio(conn, occ_id):
+    if conn.execute("SELECT 1 FROM folios WHERE occupant_id = ?", (occ_id,)).fetchone():
+        return
+    room_no, checkin, checkout = conn.execute("""SELECT room_no, checkin_date, checkout_date
+        FROM occupants WHERE id = ?""", (occ_id,)).fetchone()
+    post_stay(conn, occ_id, room_no, parse_date(checkin), parse_date(checkout))
+
+
+# Final room charges for a stay that has ended, at the rate it was booked at.
+def settle(conn, occ_id, count):
+    conn.execute("""UPDATE folios SET nights = ?, room_charges = ? * rate, settled_at = CURRENT_TIMESTAMP
+        WHERE occupant_id = ?""", (count, count, occ_id))
+
+
+# Settles every open folio whose stay ended before `before` as booked.
+def settle_before(conn, before):
+    conn.execute("""UPDATE folios SET settled_at = CURRENT_TIMESTAMP
+        WHERE settled_at IS NULL
+          AND occupant_id IN (SELECT id FROM occupants WHERE checkout_date < ? AND checkout_date GLOB ?)""",
+                 (before, migrations.ISO_DATE_GLOB))
+
+
+# The stay to charge a restaurant bill to: whoever is in room_no on day.
+def occupant_in_room(conn, room_no, day):
+    row = conn.execute(OCCUPANT_IN_ROOM_SQL, (room_no, day, day)).fetchone()
+    return row[0] if row else None
+
+
+def get(occ_id, path=DB_FILE):
+    with db.connection(path) as conn:
+        row = conn.execute(f"SELECT {FOLIO_COLUMNS} FROM folios WHERE occupant_id = ?", (int(occ_id),)).fetchone()
+    return Folio(*row) if row else None
+
+
+# Restaurant bills on the folio, oldest first, for an itemized statement.
+def bills_for(occ_id, path=DB_FILE):
+    with db.connection(path) as conn:
+        return conn.execute("""SELECT bill_number, date, table_number, total_cost FROM bills
+            WHERE occupant_id = ? ORDER BY id""", (int(occ_id),)).fetchall()
+
+
+def render_folio(folio):
+    return "\n".join([
+        f"Room {folio.room_no}: {folio.nights} nights x {folio.rate:.2f} = {folio.room_charges:.2f}",
+        f"Restaurant: {folio.bills} bills = {folio.restaurant_charges:.2f}",
+        f"Total: {folio.balance:.2f}",
+    ])
+
+
+if __name__ == "__main__":
+    # python folio.py OCCUPANT_ID
+    migrations.migrate(DB_FILE)
+    folio = get(sys.argv[1]) if len(sys.argv) > 1 else None
+    if folio is None:
+        print("No folio for that occupant")
+    else:
+        print(render_folio(folio))
+        for bill_number, day, table, total in bills_for(folio.occupant_id):
+            print(f"  {day}  #{bill_number}  {table or '':<10} {total:>10.2f}")
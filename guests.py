@@ -0,0 +1,179 @@
+import sys
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+import db
+import migrations
+from db import DB_FILE
+
+COUNTRY_CODE = '977'
+CACHE_SIZE = 4096
+
+Guest = namedtuple('Guest', 'id contact name address gender first_seen last_seen')
+GUEST_COLUMNS = "id, contact, name, address, gender, first_seen, last_seen"
+
+# The newest visit's non-empty details win; first/last seen only widen, so
+# upserting the same visit twice changes nothing.
+UPSERT_SQL = """
+    INSERT INTO guests (contact, name, address, gender, first_seen, last_seen)
+    VALUES (:contact, :name, :address, :gender, :first_seen, :last_seen)
+    ON CONFLICT (contact) DO UPDATE SET
+        name = CASE WHEN excluded.last_seen >= guests.last_seen AND excluded.name != ''
+                    THEN excluded.name ELSE COALESCE(guests.name, excluded.name) END,
+        address = CASE WHEN excluded.last_seen >= guests.last_seen AND excluded.address != ''
+                       THEN excluded.address ELSE COALESCE(guests.address, excluded.address) END,
+        gender = CASE WHEN excluded.last_seen >= guests.last_seen AND excluded.gender != ''
+                      THEN excluded.gender ELSE COALESCE(guests.gender, excluded.gender) END,
+        first_seen = MIN(guests.first_seen, excluded.first_seen),
+        last_seen = MAX(guests.last_seen, excluded.last_seen)
+"""
+
+# Every contact-bearing row: (raw contact, name, address, gender, day).
+VISITS_SQL = """
+    SELECT contact_no, name, address, gender, checkin_date FROM occupants
+    UNION ALL
+    SELECT contact_no, name, address, gender, checkin_date FROM stay_history WHERE reason != 'deleted'
+    UNION ALL
+    SELECT customer_contact, customer_name, NULL, NULL, date FROM bills
+"""
+
+LINK_SQL = """
+    UPDATE {table} SET guest_id = g.id
+    FROM guest_contacts c JOIN guests g ON g.contact = c.contact
+    WHERE c.raw = {table}.{column} AND {table}.guest_id IS NULL
+"""
+LINKED_TABLES = (('occupants', 'contact_no'), ('stay_history', 'contact_no'), ('bills', 'customer_contact'))
+
+
+# Digits only, with a leading +977 country code dropped, so "+977 980-000
+# 0000" and "9800000000" are the same guest.
+def normalize_contact(contact):
+    digits = "".join(ch for ch in str(contact or "") if ch.isdigit())
+    if len(digits) > 10 and digits.startswith(COUNTRY_CODE):
+        digits = digits[len(COUNTRY_CODE):]
+    return digits
+
+
+def valid_contact(contact):
+    return len(contact) == 10 and contact.isdigit()
+
+
+# Guest profiles keyed by normalized contact number, with an LRU cache of
+# recently looked-up guests so repeat lookups while typing never touch
+# the database. Writes go through record() inside the caller's
+# transaction and drop the cached copy, since the transaction may still
+# roll back.
+class GuestDirectory:
+    def __init__(self, path=DB_FILE, size=CACHE_SIZE):
+        self.path = path
+        self.size = size
+        self.cache = OrderedDict()
+        self.lock = threading.Lock()
+
+    def lookup(self, contact):
+        contact = normalize_contact(contact)
+        if not valid_contact(contact):
+            return None
+        with self.lock:
+            guest = self.cache.get(contact)
+            if guest is not None:
+                self.cache.move_to_end(contact)
+                return guest
+        with db.connection(self.path) as conn:
+            row = conn.execute(f"SELECT {GUEST_COLUMNS} FROM guests WHERE contact = ?", (contact,)).fetchone()
+        if row is None:
+            return None
+        guest = Guest(*row)
+        with self.lock:
+            self.cache[contact] = guest
+            if len(self.cache) > self.size:
+                self.cache.popitem(last=False)
+        return guest
+
+    def forget(self, contact):
+        with self.lock:
+            self.cache.pop(contact, None)
+
+    # Creates or updates the guest for a booking or bill inside an open
+    # transaction. Returns the guest id, or None for an unusable contact.
+    def record(self, conn, contact, name, address=None, gender=None, day=None):
+        contact = normalize_contact(contact)
+        if not valid_contact(contact):
+            return None
+        day = day or ""
+        conn.execute(UPSERT_SQL, {'contact': contact, 'name': name or "", 'address': address or "",
+                                  'gender': gender or "", 'first_seen': day, 'last_seen': day})
+        self.forget(contact)
+        return conn.execute("SELECT id FROM guests WHERE contact = ?", (contact,)).fetchone()[0]
+
+
+_directories = {}
+_directories_lock = threading.Lock()
+
+
+# One directory (and cache) per database file, shared by the room and
+# billing windows and the API.
+def directory(path=DB_FILE):
+    with _directories_lock:
+        if path not in _directories:
+            _directories[path] = GuestDirectory(path)
+        return _directories[path]
+
+
+# One-off batch job: folds every existing occupant, past stay and bill into
+# guest profiles and links the rows to them. Rows are streamed once and
+# merged in a dict keyed by normalized contact; profiles and links are then
+# written set-wise. Safe to run again. Returns (rows read, guests, seconds).
+def dedupe(path=DB_FILE):
+    start = time.perf_counter()
+    normalized = {}
+    profiles = {}
+    rows = 0
+    with db.transaction(path) as conn:
+        for raw, name, address, gender, day in conn.execute(VISITS_SQL):
+            rows += 1
+            contact = normalized.get(raw)
+            if contact is None:
+                contact = normalized[raw] = normalize_contact(raw)
+            if not valid_contact(contact):
+                continue
+            day = day or ""
+            profile = profiles.get(contact)
+            if profile is None:
+                profiles[contact] = [name or "", address or "", gender or "", day, day]
+                continue
+            newest = day >= profile[4]
+            for i, value in enumerate((name, address, gender)):
+                if value and (newest or not profile[i]):
+                    profile[i] = value
+            if day < profile[3]:
+                profile[3] = day
+            if newest:
+                profile[4] = day
+
+        conn.executemany(UPSERT_SQL, ({'contact': contact, 'name': p[0], 'address': p[1], 'gender': p[2],
+                                       'first_seen': p[3], 'last_seen': p[4]}
+                                      for contact, p in sorted(profiles.items())))
+        conn.execute("CREATE TEMP TABLE IF NOT EXISTS guest_contacts (raw TEXT PRIMARY KEY, contact TEXT) WITHOUT ROWID")
+        conn.execute("DELETE FROM guest_contacts")
+        conn.executemany("INSERT INTO guest_contacts VALUES (?, ?)",
+                         sorted((raw, contact) for raw, contact in normalized.items()
+                                if raw is not None and valid_contact(contact)))
+        for table, column in LINKED_TABLES:
+            conn.execute(LINK_SQL.format(table=table, column=column))
+        conn.execute("DELETE FROM guest_contacts")
+    directory(path).cache.clear()
+    return rows, len(profiles), time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    # python guests.py dedupe     build profiles from existing records
+    # python guests.py CONTACT    show one guest
+    migrations.migrate(DB_FILE)
+    if len(sys.argv) > 1 and sys.argv[1] == "dedupe":
+        rows, count, seconds = dedupe(DB_FILE)
+        print(f"{rows} rows -> {count} guests in {seconds:.1f} s "
+              f"({rows / seconds * 60 if seconds else rows:,.0f} rows/min)")
+    elif len(sys.argv) > 1:
+        print(directory(DB_FILE).lookup(sys.argv[1]) or "No guest with that contact number")
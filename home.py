@@ -1,28 +1,106 @@
-import tkinter as tk
-from tkinter import messagebox, Toplevel, Label
-import subprocess
+import time
+STARTED = time.perf_counter()
+
+import importlib
 import sys
 import os
+import threading
+import tkinter as tk
+from tkinter import messagebox, Toplevel, Label
 
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-# Import billing 
-try:
-    import billing
-except ImportError:
-    messagebox.showerror("Error", "billing.py not found in the same folder!")
-    exit()
+IMPORTED = time.perf_counter()
+
+
+# Wall-clock breakdown of startup, printed with --profile-startup.
+class StartupProfile:
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.lock = threading.Lock()
+        self.phases = [("imports", (IMPORTED - STARTED) * 1000)]
+
+    def record(self, phase, start):
+        ms = (time.perf_counter() - start) * 1000
+        with self.lock:
+            self.phases.append((phase, ms))
+        if self.enabled:
+            print(f"[startup] {phase:<28} {ms:8.1f} ms", file=sys.stderr)
+
+    def print_first_frame(self):
+        if not self.enabled:
+            return
+        print(f"[startup] {'time to first frame':<28} {(time.perf_counter() - STARTED) * 1000:8.1f} ms",
+              file=sys.stderr)
+
+
+# Schema checks and migrations run once, on a background thread, while the
+# dashboard is drawn. Modules wait for them before touching the database.
+class SchemaCheck:
+    def __init__(self, profile):
+        self.profile = profile
+        self.error = None
+        self.thread = threading.Thread(target=self.run, name="schema-check", daemon=True)
+        self.thread.start()
+
+    def run(self):
+        start = time.perf_counter()
+        try:
+            import db
+            import instrument
+            import migrations
+            instrument.setup_logging()
+            migrations.migrate(db.DB_FILE)
+        except Exception as e:
+            self.error = e
+        self.profile.record("db open + schema check", start)
+
+    def wait(self):
+        self.thread.join()
+        return self.error
 
 
 class HotelDashboard(tk.Tk):
-    def __init__(self):
+    def __init__(self, profile=None):
+        start = time.perf_counter()
+        self.profile = profile or StartupProfile()
+        self.schema = SchemaCheck(self.profile)
         super().__init__()
+        self.modules = {}
         self.title("Stay-In Hotel Management System")
         self.geometry("1100x650")
         self.configure(bg="#1a1a2e")
         self.resizable(False, False)
+        self.details_win = None
+        self.bind("<F12>", lambda e: self.open_diagnostics())
 
         self.create_ui()
+        self.profile.record("tk + ui build", start)
+        self.after_idle(self.profile.print_first_frame)
+
+    # Imports a module the first time its button is clicked, once the
+    # schema check has finished. Returns None if it cannot be used.
+    def load(self, name):
+        if name in self.modules:
+            return self.modules[name]
+        self.config(cursor="watch")
+        self.update_idletasks()
+        try:
+            error = self.schema.wait()
+            if error is not None:
+                messagebox.showerror("Error", f"Database could not be opened: {error}")
+                return None
+            start = time.perf_counter()
+            try:
+                module = importlib.import_module(name)
+            except ImportError:
+                messagebox.showerror("Error", f"{name}.py not found in the same folder!")
+                return None
+            self.profile.record(f"import {name}", start)
+        finally:
+            self.config(cursor="")
+        self.modules[name] = module
+        return module
 
     def create_ui(self):
         header = tk.Frame(self, bg="#158aff", height=100)
@@ -61,12 +139,15 @@ class HotelDashboard(tk.Tk):
 
         # Room Booking Button 
         tk.Button(btn_frame, text="Room Booking\nCheck-in / Check-out / Status",
-                  bg="#e74c3c", command=self.open_details_original, **style).grid(row=0, column=1, padx=60, pady=30)
+                  bg="#e74c3c", command=self.open_details, **style).grid(row=0, column=1, padx=60, pady=30)
 
         Label(self, text="© 2025 Stay-In Hotel • Kathmandu, Nepal", 
               font=("Arial", 10), fg="#888", bg="#1a1a2e").pack(side=tk.BOTTOM, pady=20)
 
     def open_billing(self):
+        billing = self.load("billing")
+        if billing is None:
+            return
         win = Toplevel(self)
         win.title("Hotel Billing System - 8 Tables")
         win.geometry("1370x720")  
@@ -76,18 +157,35 @@ class HotelDashboard(tk.Tk):
         
         billing.HotelManagementSystem(win)
 
-    def open_details_original(self):
-        
-        file_path = os.path.join(os.path.dirname(__file__), "details.py")
-        if os.path.exists(file_path):
-            subprocess.Popen([sys.executable, file_path])
-            messagebox.showinfo("Room Booking", "Room Management System opened in a new window!")
-        else:
-            messagebox.showerror("Error", "details.py not found!")
+    def open_diagnostics(self):
+        diagnostics = self.load("diagnostics")
+        if diagnostics is not None:
+            diagnostics.open_panel(self)
+
+    # Room booking runs in this process as a Toplevel; a second click brings
+    # the open window to the front instead of creating another one.
+    def open_details(self):
+        if self.details_win is not None and self.details_win.winfo_exists():
+            self.details_win.deiconify()
+            self.details_win.lift()
+            self.details_win.focus_force()
+            return
+        details = self.load("details")
+        if details is None:
+            return
+        self.details_win = Toplevel(self)
+        self.details_win.focus_force()
+        details.RoomManagement(self.details_win)
 
 
 # Run dashboard
 if __name__ == "__main__":
-    
-    app = HotelDashboard()
+    # argparse (and re under it) is imported here, outside the timed imports.
+    import argparse
+    parser = argparse.ArgumentParser(description="Stay-In Hotel Management System")
+    parser.add_argument("--profile-startup", action="store_true",
+                        help="print how long imports, the schema check and the UI build take")
+    args = parser.parse_args()
+
+    app = HotelDashboard(StartupProfile(args.profile_startup))
     app.mainloop()
@@ -0,0 +1,140 @@
+import bisect
+import logging
+import sqlite3
+import threading
+import time
+from collections import deque
+from functools import lru_cache, wraps
+from logging.handlers import RotatingFileHandler
+
+LOG_FILE = 'hotel.log'
+LOG_MAX_BYTES = 1024 * 1024
+LOG_BACKUPS = 3
+SLOW_QUERY_MS = 50
+SLOW_CALLBACK_MS = 100
+SLOW_LOG_SIZE = 50
+
+# Upper bounds (ms) of the histogram buckets; the last bucket is open ended.
+BUCKETS_MS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+log = logging.getLogger('hotel')
+log.addHandler(logging.NullHandler())
+log.propagate = False
+
+
+# Rotating log file for slow queries and slow callbacks. Front ends call
+# this once at startup; headless tools can skip it.
+def setup_logging(path=LOG_FILE):
+    if any(isinstance(h, RotatingFileHandler) for h in log.handlers):
+        return
+    handler = RotatingFileHandler(path, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUPS, encoding='utf-8')
+    handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(threadName)s %(message)s"))
+    log.addHandler(handler)
+    log.setLevel(logging.INFO)
+
+
+class Histogram:
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS_MS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, ms):
+        self.counts[bisect.bisect_left(BUCKETS_MS, ms)] += 1
+        self.count += 1
+        self.total += ms
+        if ms > self.max:
+            self.max = ms
+
+    # Upper bound of the bucket holding the given percentile (0-100).
+    def percentile(self, pct):
+        target = self.count * pct / 100
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if n and seen >= target:
+                return BUCKETS_MS[i] if i < len(BUCKETS_MS) else self.max
+        return 0.0
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else 0.0
+
+
+_lock = threading.Lock()
+_histograms = {}
+slow_queries = deque(maxlen=SLOW_LOG_SIZE)
+
+
+def record(name, ms):
+    with _lock:
+        hist = _histograms.get(name)
+        if hist is None:
+            hist = _histograms[name] = Histogram()
+        hist.add(ms)
+
+
+# [(name, count, mean, p50, p95, p99, max)] in ms, busiest first.
+def snapshot():
+    with _lock:
+        rows = [(name, h.count, h.mean, h.percentile(50), h.percentile(95), h.percentile(99), h.max)
+                for name, h in _histograms.items()]
+    return sorted(rows, key=lambda row: row[1] * row[2], reverse=True)
+
+
+def reset():
+    with _lock:
+        _histograms.clear()
+        slow_queries.clear()
+
+
+# DML statements are grouped in the histograms by verb and table, e.g.
+# "sql SELECT occupants"; everything else by verb alone ("sql CREATE").
+@lru_cache(maxsize=1024)
+def query_name(sql):
+    words = sql.replace("(", " ").split()
+    if not words:
+        return "sql"
+    verb = words[0].upper()
+    if verb not in ("SELECT", "WITH", "INSERT", "UPDATE", "DELETE", "REPLACE"):
+        return f"sql {verb}"
+    upper = [w.upper() for w in words]
+    keyword = "UPDATE" if verb == "UPDATE" else "INTO" if verb in ("INSERT", "REPLACE") else "FROM"
+    if keyword in upper:
+        i = upper.index(keyword) + 1
+        if i < len(words):
+            return f"sql {verb} {words[i].strip(',;').lower()}"
+    return f"sql {verb}"
+
+
+# Keeps and logs a slow statement with its EXPLAIN QUERY PLAN. params is
+# None for executemany, which is logged without a plan.
+def slow_query(conn, sql, params, ms):
+    plan = []
+    if params is not None and query_name(sql).split()[1] in ("SELECT", "WITH", "INSERT", "UPDATE", "DELETE"):
+        try:
+            # Straight to sqlite3 so the EXPLAIN is not timed itself.
+            plan = [row[-1] for row in sqlite3.Connection.execute(conn, "EXPLAIN QUERY PLAN " + sql, params)]
+        except Exception as e:
+            plan = [f"(no plan: {e})"]
+    entry = (time.strftime("%H:%M:%S"), ms, " ".join(sql.split()), plan)
+    slow_queries.append(entry)
+    log.warning("slow query %.1f ms: %s | plan: %s", ms, entry[2], "; ".join(plan) or "-")
+
+
+# Times a UI callback or other hot path under the given name.
+def timed(name):
+    def decorate(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                ms = (time.perf_counter() - start) * 1000
+                record(name, ms)
+                if ms >= SLOW_CALLBACK_MS:
+                    log.warning("slow callback %s %.1f ms", name, ms)
+        return wrapper
+    return decorate
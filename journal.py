@@ -0,0 +1,76 @@
+import json
+import os
+import threading
+
+JOURNAL_FILE = 'orders.journal'
+SYNC_INTERVAL = 0.2
+
+
+# Append-only JSON Lines log of open-order events. Each event is written
+# and flushed to the OS immediately, so a crash of the app loses nothing;
+# fsync runs on a background thread at most every SYNC_INTERVAL seconds,
+# so one disk flush covers every event written since the last one.
+class OrderJournal:
+    def __init__(self, path=JOURNAL_FILE, sync_interval=SYNC_INTERVAL):
+        self.path = path
+        self.sync_interval = sync_interval
+        self.lock = threading.Lock()
+        self.dirty = False
+        self.file = open(path, 'a', encoding='utf-8')
+        self.closed = threading.Event()
+        self.thread = threading.Thread(target=self.sync_loop, name="order-journal", daemon=True)
+        self.thread.start()
+
+    def append(self, event):
+        line = json.dumps(event, separators=(',', ':')) + '\n'
+        with self.lock:
+            self.file.write(line)
+            self.file.flush()
+            self.dirty = True
+
+    def sync(self):
+        with self.lock:
+            if not self.dirty or self.file.closed:
+                return
+            self.dirty = False
+            fd = self.file.fileno()
+        os.fsync(fd)
+
+    def sync_loop(self):
+        while not self.closed.wait(self.sync_interval):
+            self.sync()
+
+    # Replaces the whole journal with the given events, e.g. a snapshot of
+    # the orders that are still open.
+    def rewrite(self, events):
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as tmp:
+            for event in events:
+                tmp.write(json.dumps(event, separators=(',', ':')) + '\n')
+            tmp.flush()
+            os.fsync(tmp.fileno())
+        with self.lock:
+            self.file.close()
+            os.replace(tmp_path, self.path)
+            self.file = open(self.path, 'a', encoding='utf-8')
+            self.dirty = False
+
+    def close(self):
+        self.closed.set()
+        self.thread.join()
+        self.sync()
+        with self.lock:
+            self.file.close()
+
+
+# Events in the order they were written. A torn last line from a crash
+# mid-write is ignored.
+def read_events(path=JOURNAL_FILE):
+    if not os.path.exists(path):
+        return
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            try:
+                yield json.loads(line)
+            except ValueError:
+                return
@@ -0,0 +1,80 @@
+import bisect
+import sys
+from collections import namedtuple
+
+import db
+import migrations
+from db import DB_FILE
+from versioned import VersionedCache
+
+COMPLETE_LIMIT = 10
+
+MenuItem = namedtuple('MenuItem', 'id name price category')
+
+
+# In-memory copy of menu_items. Names are kept lowercased in a sorted list
+# so a prefix search is one bisect plus a short scan; see versioned.py for
+# when it is reloaded.
+class MenuCatalog(VersionedCache):
+    version_table = 'menu_version'
+
+    def __contains__(self, name):
+        return str(name).strip().lower() in self.by_name
+
+    def __len__(self):
+        return len(self.items)
+
+    def get(self, name):
+        return self.by_name.get(str(name).strip().lower())
+
+    def load(self, conn):
+        rows = conn.execute("SELECT id, name, price, category FROM menu_items").fetchall()
+        self.items = {row[0]: MenuItem(*row) for row in rows}
+        self.by_name = {item.name.lower(): item for item in self.items.values()}
+        self.keys = sorted(self.by_name)
+
+    # Menu items whose name starts with prefix, alphabetically.
+    def complete(self, prefix, limit=COMPLETE_LIMIT):
+        prefix = str(prefix).strip().lower()
+        if not prefix:
+            return []
+        matches = []
+        i = bisect.bisect_left(self.keys, prefix)
+        while i < len(self.keys) and len(matches) < limit and self.keys[i].startswith(prefix):
+            matches.append(self.by_name[self.keys[i]])
+            i += 1
+        return matches
+
+    # Menu id for a line item name inside an open transaction, adding the
+    # name to the menu at the given price if it is new.
+    def resolve(self, conn, name, price):
+        item = self.get(name)
+        if item is not None:
+            return item.id
+        conn.execute("INSERT OR IGNORE INTO menu_items (name, price) VALUES (?, ?)", (name.strip(), price))
+        self.invalidate()
+        return conn.execute("SELECT id FROM menu_items WHERE name = ?", (name.strip(),)).fetchone()[0]
+
+    def set_item(self, name, price, category=None):
+        name = str(name).strip()
+        if not name:
+            raise ValueError("Item name is required!")
+        with db.transaction(self.path) as conn:
+            conn.execute("""INSERT INTO menu_items (name, price, category) VALUES (?, ?, ?)
+                ON CONFLICT (name) DO UPDATE SET price = excluded.price,
+                                                 category = COALESCE(excluded.category, category)""",
+                         (name, float(price), category))
+        self.invalidate()
+
+
+if __name__ == "__main__":
+    # python menu.py                       list the menu
+    # python menu.py NAME PRICE [CATEGORY] add an item or change its price
+    migrations.migrate(DB_FILE)
+    menu = MenuCatalog(DB_FILE)
+    if len(sys.argv) >= 3:
+        menu.set_item(sys.argv[1], sys.argv[2], sys.argv[3] if len(sys.argv) > 3 else None)
+        menu.refresh()
+    for key in menu.keys:
+        item = menu.by_name[key]
+        print(f"{item.id:>5}  {item.name:<30} {item.price:>10.2f}  {item.category or ''}")
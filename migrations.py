@@ -0,0 +1,496 @@
+import db
+from availability import parse_date
+from db import DB_FILE
+
+ISO_DATE_GLOB = "[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9]"
+
+
+def table_columns(conn, table):
+    return [info[1] for info in conn.execute(f"PRAGMA table_info({table})")]
+
+
+# Rewrites stay dates the old free-text form accepted (e.g. 10/10/2026) as
+# YYYY-MM-DD, which every SQL range check and julianday() relies on. Dates
+# parse_date cannot read are left as they are.
+def normalize_stay_dates(conn, table):
+    def iso(text):
+        try:
+            return parse_date(text).isoformat()
+        except ValueError:
+            return text
+    rows = conn.execute(f"""SELECT id, checkin_date, checkout_date FROM {table}
+        WHERE NOT (checkin_date GLOB ? AND checkout_date GLOB ?)""", (ISO_DATE_GLOB, ISO_DATE_GLOB)).fetchall()
+    conn.executemany(f"UPDATE {table} SET checkin_date = ?, checkout_date = ? WHERE id = ?",
+                     [(iso(checkin), iso(checkout), occ_id) for occ_id, checkin, checkout in rows])
+
+
+# 1: the tables billing.py and details.py used to create on their own.
+# Old databases without Hotel.table_number are upgraded instead of deleted.
+def create_base_tables(conn):
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS Hotel (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            table_number TEXT,
+            customer_name TEXT,
+            customer_contact TEXT,
+            item_name TEXT,
+            item_quantity INTEGER,
+            cost_per_item REAL,
+            bill_number INTEGER,
+            date TEXT,
+            total_cost REAL
+        )
+    ''')
+    if 'table_number' not in table_columns(conn, 'Hotel'):
+        conn.execute("ALTER TABLE Hotel ADD COLUMN table_number TEXT")
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS occupants (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            room_no TEXT NOT NULL,
+            name TEXT,
+            contact_no TEXT,
+            address TEXT,
+            gender TEXT,
+            checkin_date TEXT,
+            checkout_date TEXT
+        )
+    ''')
+
+
+# 2: indexes for double-booking checks, stay ranges and bill lookups.
+def add_lookup_indexes(conn):
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_occupants_room ON occupants(room_no)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_occupants_dates ON occupants(checkin_date, checkout_date)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_hotel_bill ON Hotel(bill_number)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_hotel_date ON Hotel(date)")
+
+
+# 3: split the one-row-per-item Hotel table into bills + bill_items. Hotel
+# stays available as a read-only view with the old columns.
+def normalize_bills(conn):
+    conn.execute('''
+        CREATE TABLE bills (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            bill_number INTEGER,
+            table_number TEXT,
+            customer_name TEXT,
+            customer_contact TEXT,
+            date TEXT,
+            total_cost REAL
+        )
+    ''')
+    conn.execute('''
+        CREATE TABLE bill_items (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            bill_id INTEGER NOT NULL REFERENCES bills(id),
+            item_name TEXT,
+            item_quantity INTEGER,
+            cost_per_item REAL,
+            total_cost REAL
+        )
+    ''')
+    conn.execute("CREATE INDEX idx_bills_number ON bills(bill_number)")
+    conn.execute("CREATE INDEX idx_bills_date ON bills(date)")
+    conn.execute("CREATE INDEX idx_bill_items_bill ON bill_items(bill_id)")
+
+    conn.execute('''
+        INSERT INTO bills (bill_number, table_number, customer_name, customer_contact, date, total_cost)
+        SELECT bill_number, table_number, customer_name, customer_contact, date, SUM(total_cost)
+        FROM Hotel
+        GROUP BY bill_number, table_number, customer_name, customer_contact, date
+        ORDER BY MIN(id)
+    ''')
+    conn.execute('''
+        INSERT INTO bill_items (id, bill_id, item_name, item_quantity, cost_per_item, total_cost)
+        SELECT h.id, b.id, h.item_name, h.item_quantity, h.cost_per_item, h.total_cost
+        FROM Hotel h
+        JOIN bills b ON b.bill_number IS h.bill_number
+                    AND b.table_number IS h.table_number
+                    AND b.customer_name IS h.customer_name
+                    AND b.customer_contact IS h.customer_contact
+                    AND b.date IS h.date
+        ORDER BY h.id
+    ''')
+    conn.execute("DROP TABLE Hotel")
+    conn.execute('''
+        CREATE VIEW Hotel AS
+        SELECT i.id, b.table_number, b.customer_name, b.customer_contact, i.item_name,
+               i.item_quantity, i.cost_per_item, b.bill_number, b.date, i.total_cost
+        FROM bill_items i
+        JOIN bills b ON b.id = i.bill_id
+    ''')
+
+
+# 4: FTS5 index over occupant names, kept in step by triggers. The prefix
+# option stores 2 and 3 letter prefixes so search-as-you-type stays indexed.
+def add_occupant_search(conn):
+    conn.execute('''
+        CREATE VIRTUAL TABLE occupants_fts USING fts5(
+            name, content='occupants', content_rowid='id', prefix='2 3'
+        )
+    ''')
+    conn.execute('''
+        CREATE TRIGGER occupants_fts_insert AFTER INSERT ON occupants BEGIN
+            INSERT INTO occupants_fts(rowid, name) VALUES (new.id, new.name);
+        END
+    ''')
+    conn.execute('''
+        CREATE TRIGGER occupants_fts_delete AFTER DELETE ON occupants BEGIN
+            INSERT INTO occupants_fts(occupants_fts, rowid, name) VALUES ('delete', old.id, old.name);
+        END
+    ''')
+    conn.execute('''
+        CREATE TRIGGER occupants_fts_update AFTER UPDATE OF name ON occupants BEGIN
+            INSERT INTO occupants_fts(occupants_fts, rowid, name) VALUES ('delete', old.id, old.name);
+            INSERT INTO occupants_fts(rowid, name) VALUES (new.id, new.name);
+        END
+    ''')
+    conn.execute("INSERT INTO occupants_fts(occupants_fts) VALUES ('rebuild')")
+
+
+# 5: room catalog replacing the hardcoded ROOMS list in details.py. Any
+# change bumps catalog_version so cached copies know to reload.
+def add_room_catalog(conn):
+    conn.execute('''
+        CREATE TABLE room_types (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL UNIQUE,
+            description TEXT
+        )
+    ''')
+    conn.execute('''
+        CREATE TABLE rate_plans (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            room_type_id INTEGER NOT NULL REFERENCES room_types(id),
+            name TEXT NOT NULL,
+            price_per_day REAL NOT NULL,
+            is_default INTEGER NOT NULL DEFAULT 0,
+            UNIQUE (room_type_id, name)
+        )
+    ''')
+    conn.execute('''
+        CREATE TABLE rooms (
+            room_no TEXT PRIMARY KEY,
+            floor INTEGER,
+            room_type_id INTEGER NOT NULL REFERENCES room_types(id),
+            status TEXT NOT NULL DEFAULT 'Clean'
+        )
+    ''')
+    conn.execute("CREATE TABLE catalog_version (id INTEGER PRIMARY KEY CHECK (id = 1), version INTEGER NOT NULL)")
+    conn.execute("INSERT INTO catalog_version VALUES (1, 0)")
+    for table in ('room_types', 'rate_plans', 'rooms'):
+        for event in ('INSERT', 'UPDATE', 'DELETE'):
+            conn.execute(f'''
+                CREATE TRIGGER {table}_{event.lower()}_version AFTER {event} ON {table} BEGIN
+                    UPDATE catalog_version SET version = version + 1 WHERE id = 1;
+                END
+            ''')
+
+    room_type = conn.execute("INSERT INTO room_types (name, description) VALUES ('Standard', 'Standard room')").lastrowid
+    conn.execute("INSERT INTO rate_plans (room_type_id, name, price_per_day, is_default) VALUES (?, 'Rack', 2500, 1)",
+                 (room_type,))
+    conn.executemany("INSERT INTO rooms (room_no, floor, room_type_id, status) VALUES (?, 1, ?, 'Clean')",
+                     [(str(room_no), room_type) for room_no in range(101, 107)])
+
+
+# 6: materialized daily rollups for reports. Writes to bills or bill_items
+# mark their day in rollup_dirty; reports.refresh_rollups recomputes those
+# days once they are closed.
+def add_daily_rollups(conn):
+    conn.execute('''
+        CREATE TABLE daily_revenue (
+            date TEXT NOT NULL,
+            table_number TEXT,
+            bills INTEGER NOT NULL,
+            revenue REAL NOT NULL,
+            PRIMARY KEY (date, table_number)
+        )
+    ''')
+    conn.execute('''
+        CREATE TABLE daily_item_sales (
+            date TEXT NOT NULL,
+            item_name TEXT,
+            quantity INTEGER NOT NULL,
+            revenue REAL NOT NULL,
+            PRIMARY KEY (date, item_name)
+        )
+    ''')
+    conn.execute("CREATE TABLE rollup_dirty (date TEXT PRIMARY KEY)")
+    conn.execute('''
+        CREATE TRIGGER bills_rollup_insert AFTER INSERT ON bills BEGIN
+            INSERT OR IGNORE INTO rollup_dirty VALUES (new.date);
+        END
+    ''')
+    conn.execute('''
+        CREATE TRIGGER bills_rollup_update AFTER UPDATE ON bills BEGIN
+            INSERT OR IGNORE INTO rollup_dirty VALUES (old.date);
+            INSERT OR IGNORE INTO rollup_dirty VALUES (new.date);
+        END
+    ''')
+    conn.execute('''
+        CREATE TRIGGER bills_rollup_delete AFTER DELETE ON bills BEGIN
+            INSERT OR IGNORE INTO rollup_dirty VALUES (old.date);
+        END
+    ''')
+    conn.execute('''
+        CREATE TRIGGER bill_items_rollup_insert AFTER INSERT ON bill_items BEGIN
+            INSERT OR IGNORE INTO rollup_dirty SELECT date FROM bills WHERE id = new.bill_id;
+        END
+    ''')
+    conn.execute("INSERT OR IGNORE INTO rollup_dirty SELECT DISTINCT date FROM bills WHERE date IS NOT NULL")
+
+
+# 7: persisted sequences for bill numbers. Numbers start above every
+# legacy random bill number, and the partial unique index guarantees the
+# sequence never hands out a duplicate.
+def add_sequences(conn):
+    conn.execute("CREATE TABLE sequences (name TEXT PRIMARY KEY, next_value INTEGER NOT NULL)")
+    start = conn.execute("SELECT MAX(COALESCE(MAX(bill_number), 0), 9999) + 1 FROM bills").fetchone()[0]
+    conn.execute("INSERT INTO sequences VALUES ('bill_number', ?)", (start,))
+    conn.execute(f"CREATE UNIQUE INDEX idx_bills_number_unique ON bills(bill_number) WHERE bill_number >= {start}")
+
+
+# 8: restaurant floor layout, seeded with the original eight tables.
+def add_dining_tables(conn):
+    conn.execute('''
+        CREATE TABLE dining_tables (
+            label TEXT PRIMARY KEY,
+            zone TEXT NOT NULL,
+            position INTEGER NOT NULL
+        )
+    ''')
+    conn.executemany("INSERT INTO dining_tables VALUES (?, 'Main Hall', ?)",
+                     [(str(i), i) for i in range(1, 9)])
+
+
+# 9: menu catalog. Past line items seed the menu (latest non-zero price per
+# name, case-insensitive) and are linked to it through bill_items.menu_item_id;
+# daily_item_sales is rebuilt keyed by menu item id.
+def add_menu(conn):
+    conn.execute('''
+        CREATE TABLE menu_items (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL UNIQUE COLLATE NOCASE,
+            price REAL NOT NULL,
+            category TEXT
+        )
+    ''')
+    conn.execute("CREATE TABLE menu_version (id INTEGER PRIMARY KEY CHECK (id = 1), version INTEGER NOT NULL)")
+    conn.execute("INSERT INTO menu_version VALUES (1, 0)")
+    for event in ('INSERT', 'UPDATE', 'DELETE'):
+        conn.execute(f'''
+            CREATE TRIGGER menu_items_{event.lower()}_version AFTER {event} ON menu_items BEGIN
+                UPDATE menu_version SET version = version + 1 WHERE id = 1;
+            END
+        ''')
+
+    conn.execute("ALTER TABLE bill_items ADD COLUMN menu_item_id INTEGER REFERENCES menu_items(id)")
+    conn.execute('''
+        INSERT INTO menu_items (name, price)
+        SELECT TRIM(item_name), cost_per_item FROM bill_items
+        WHERE id IN (SELECT MAX(id) FROM bill_items
+                     WHERE TRIM(item_name) != '' AND cost_per_item > 0
+                     GROUP BY TRIM(item_name) COLLATE NOCASE)
+    ''')
+    conn.execute("UPDATE bill_items SET menu_item_id = (SELECT id FROM menu_items WHERE name = TRIM(bill_items.item_name))")
+    conn.execute("CREATE INDEX idx_bill_items_menu_item ON bill_items(menu_item_id)")
+
+    conn.execute("DROP TABLE daily_item_sales")
+    conn.execute('''
+        CREATE TABLE daily_item_sales (
+            date TEXT NOT NULL,
+            menu_item_id INTEGER,
+            item_name TEXT,
+            quantity INTEGER NOT NULL,
+            revenue REAL NOT NULL,
+            PRIMARY KEY (date, menu_item_id)
+        )
+    ''')
+    conn.execute("INSERT OR IGNORE INTO rollup_dirty SELECT DISTINCT date FROM bills WHERE date IS NOT NULL")
+
+
+# 10: stay history. Finished, cancelled and deleted bookings move here
+# instead of being deleted; `stays` is every stay that really happened,
+# current or past, for the occupancy reports. Occupant dates are made ISO
+# first, since moving stays by date compares them as strings.
+def add_stay_history(conn):
+    normalize_stay_dates(conn, 'occupants')
+    conn.execute('''
+        CREATE TABLE stay_history (
+            id INTEGER PRIMARY KEY,
+            room_no TEXT NOT NULL,
+            name TEXT,
+            contact_no TEXT,
+            address TEXT,
+            gender TEXT,
+            checkin_date TEXT,
+            checkout_date TEXT,
+            booked_checkout_date TEXT,
+            reason TEXT NOT NULL,
+            archived_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    conn.execute("CREATE INDEX idx_stay_history_room ON stay_history(room_no, checkin_date)")
+    conn.execute("CREATE INDEX idx_stay_history_dates ON stay_history(checkin_date, checkout_date)")
+    conn.execute("CREATE INDEX idx_stay_history_contact ON stay_history(contact_no)")
+    conn.execute('''
+        CREATE VIEW stays AS
+        SELECT id, room_no, name, contact_no, checkin_date, checkout_date FROM occupants
+        UNION ALL
+        SELECT id, room_no, name, contact_no, checkin_date, checkout_date FROM stay_history
+        WHERE reason IN ('checked_out', 'early_checkout')
+    ''')
+
+
+# 11: guest profiles keyed by normalized contact number. Bookings, past
+# stays and bills link to them through guest_id; existing rows are linked
+# by the guests.py dedupe job rather than here.
+def add_guests(conn):
+    conn.execute('''
+        CREATE TABLE guests (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            contact TEXT NOT NULL UNIQUE,
+            name TEXT,
+            address TEXT,
+            gender TEXT,
+            first_seen TEXT,
+            last_seen TEXT
+        )
+    ''')
+    for table in ('occupants', 'stay_history', 'bills'):
+        conn.execute(f"ALTER TABLE {table} ADD COLUMN guest_id INTEGER REFERENCES guests(id)")
+        conn.execute(f"CREATE INDEX idx_{table}_guest ON {table}(guest_id)")
+
+
+# 12: folios. One row per stay with its room charges (nights x rate) and a
+# running restaurant total that triggers keep current as bills charged to
+# the room are saved, so the balance at checkout is a single-row read.
+def add_folios(conn):
+    conn.execute('''
+        CREATE TABLE folios (
+            occupant_id INTEGER PRIMARY KEY,
+            room_no TEXT NOT NULL,
+            nights INTEGER NOT NULL DEFAULT 0,
+            rate REAL NOT NULL DEFAULT 0,
+            room_charges REAL NOT NULL DEFAULT 0,
+            restaurant_charges REAL NOT NULL DEFAULT 0,
+            bills INTEGER NOT NULL DEFAULT 0,
+            balance REAL GENERATED ALWAYS AS (room_charges + restaurant_charges) VIRTUAL,
+            settled_at TEXT
+        )
+    ''')
+    conn.execute("ALTER TABLE bills ADD COLUMN occupant_id INTEGER")
+    conn.execute("CREATE INDEX idx_bills_occupant ON bills(occupant_id) WHERE occupant_id IS NOT NULL")
+    conn.execute('''
+        CREATE TRIGGER bills_folio_insert AFTER INSERT ON bills WHEN new.occupant_id IS NOT NULL BEGIN
+            UPDATE folios SET restaurant_charges = restaurant_charges + COALESCE(new.total_cost, 0),
+                              bills = bills + 1
+            WHERE occupant_id = new.occupant_id;
+        END
+    ''')
+    conn.execute('''
+        CREATE TRIGGER bills_folio_update AFTER UPDATE OF total_cost, occupant_id ON bills BEGIN
+            UPDATE folios SET restaurant_charges = restaurant_charges - COALESCE(old.total_cost, 0),
+                              bills = bills - 1
+            WHERE occupant_id = old.occupant_id;
+            UPDATE folios SET restaurant_charges = restaurant_charges + COALESCE(new.total_cost, 0),
+                              bills = bills + 1
+            WHERE occupant_id = new.occupant_id;
+        END
+    ''')
+    # Settled folios keep their totals when old bills are archived.
+    conn.execute('''
+        CREATE TRIGGER bills_folio_delete AFTER DELETE ON bills WHEN old.occupant_id IS NOT NULL BEGIN
+            UPDATE folios SET restaurant_charges = restaurant_charges - COALESCE(old.total_cost, 0),
+                              bills = bills - 1
+            WHERE occupant_id = old.occupant_id AND settled_at IS NULL;
+        END
+    ''')
+    # Stays recorded before step 10 normalized dates may still hold other
+    # formats; dates nothing can parse get no room charges.
+    for table in ('occupants', 'stay_history'):
+        normalize_stay_dates(conn, table)
+    stay_charges = '''
+        SELECT s.id, s.room_no, nights, COALESCE(p.price_per_day, 0), nights * COALESCE(p.price_per_day, 0), {settled}
+        FROM (SELECT *, COALESCE(MAX(0, CAST(julianday(checkout_date) - julianday(checkin_date) AS INTEGER)), 0) AS nights
+              FROM {table}) s
+        LEFT JOIN rooms r ON r.room_no = s.room_no
+        LEFT JOIN rate_plans p ON p.room_type_id = r.room_type_id AND p.is_default = 1
+    '''
+    columns = "occupant_id, room_no, nights, rate, room_charges, settled_at"
+    conn.execute(f"INSERT INTO folios ({columns}) " + stay_charges.format(table="occupants", settled="NULL"))
+    conn.execute(f"INSERT INTO folios ({columns}) " + stay_charges.format(table="stay_history", settled="s.archived_at")
+                 + " WHERE s.reason IN ('checked_out', 'early_checkout')")
+
+
+# 13: which front end serves each table. The billing window and the HTTP
+# API each keep their own open orders and journal, so a table belongs to
+# exactly one of them; all existing tables stay with the billing window.
+def add_table_front_ends(conn):
+    conn.execute("""ALTER TABLE dining_tables ADD COLUMN front_end TEXT NOT NULL DEFAULT 'desktop'
+        CHECK (front_end IN ('desktop', 'api'))""")
+
+
+# 14: item rollups keyed like the live item query, by menu item or, for
+# lines not on the menu, by name; step 9's (date, menu_item_id) key folded
+# every unlinked line of a day into one row. Days whose bills are still in
+# the hot tables are rebuilt; archived days keep their rollups.
+def rekey_item_sales(conn):
+    conn.execute('''
+        CREATE TABLE daily_item_sales_new (
+            date TEXT NOT NULL,
+            menu_item_id INTEGER,
+            item_name TEXT,
+            quantity INTEGER NOT NULL,
+            revenue REAL NOT NULL
+        )
+    ''')
+    conn.execute("""INSERT INTO daily_item_sales_new
+        SELECT date, menu_item_id, item_name, quantity, revenue FROM daily_item_sales""")
+    conn.execute("DROP TABLE daily_item_sales")
+    conn.execute("ALTER TABLE daily_item_sales_new RENAME TO daily_item_sales")
+    conn.execute("""CREATE UNIQUE INDEX idx_daily_item_sales_key
+        ON daily_item_sales(date, COALESCE(menu_item_id, item_name))""")
+    conn.execute("INSERT OR IGNORE INTO rollup_dirty SELECT DISTINCT date FROM bills WHERE date IS NOT NULL")
+
+
+# Applied in order; a database's PRAGMA user_version is the number of
+# migrations it already has. Only ever append to this list.
+MIGRATIONS = [
+    create_base_tables,
+    add_lookup_indexes,
+    normalize_bills,
+    add_occupant_search,
+    add_room_catalog,
+    add_daily_rollups,
+    add_sequences,
+    add_dining_tables,
+    add_menu,
+    add_stay_history,
+    add_guests,
+    add_folios,
+    add_table_front_ends,
+    rekey_item_sales,
+]
+
+
+def schema_version(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(path=DB_FILE):
+    with db.connection(path) as conn:
+        if schema_version(conn) >= len(MIGRATIONS):
+            return
+        # IMMEDIATE takes the write lock up front so two processes starting
+        # together cannot both apply the same step.
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            version = schema_version(conn)
+            for number, step in enumerate(MIGRATIONS[version:], start=version + 1):
+                step(conn)
+                conn.execute(f"PRAGMA user_version = {number}")
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
@@ -0,0 +1,47 @@
+HOTEL_HEADER = "\t\t\t  Stay-In Hotel\n\t\t\tContact: 977896765\n"
+RULE = "=" * 60 + "\n"
+DASHES = "-" * 60 + "\n"
+
+
+def table_name(label):
+    return f"Table-{label}"
+
+
+def header(table, bill_no, date):
+    return HOTEL_HEADER + RULE + f"       {table} | Bill No: {bill_no} | {date}\n" + RULE
+
+
+def customer_block(name, contact):
+    return (f"Customer: {name}\n"
+            f"Contact : {contact}\n"
+            + DASHES
+            + f"{'Item Name':<20} {'Qty':<8} {'Rate':<10} {'Total'}\n"
+            + DASHES)
+
+
+def item_line(name, qty, cost, total):
+    return f"{name:<20} {qty:<8} ${cost:<9.2f} ${total:.2f}\n"
+
+
+def total_block(grand_total):
+    return (DASHES
+            + f"{'GRAND TOTAL':>50} ${grand_total:.2f}\n"
+            + RULE
+            + "          Thank You! Visit Again!\n")
+
+
+# Whole receipt in the layout the billing window shows. table is the
+# printed name, e.g. "Table-3".
+def render_bill(table, bill_no, date, name, contact, items, grand_total):
+    parts = [header(table, bill_no, date)]
+    if name:
+        parts.append(customer_block(name, contact))
+        parts.extend(item_line(*line) for line in items)
+        if grand_total > 0:
+            parts.append(total_block(grand_total))
+    return "".join(parts)
+
+
+def render_session(data, date):
+    return render_bill(table_name(data.table_num), data.bill_no, date, data.customer_name,
+                       data.customer_contact, data.items_list, data.grand_total)
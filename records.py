@@ -0,0 +1,160 @@
+from tkinter import Label, Entry, Button, Frame, StringVar, END, messagebox, ttk
+
+import db
+from db import DB_FILE
+
+RECORD_PAGE_SIZE = 100
+BILL_COLUMNS = "id, bill_number, table_number, customer_name, customer_contact, date, total_cost"
+
+
+def bill_filters(date_from=None, date_to=None, table=None, customer=None):
+    clauses, params = [], []
+    if date_from:
+        clauses.append("date >= ?")
+        params.append(date_from)
+    if date_to:
+        clauses.append("date <= ?")
+        params.append(date_to)
+    if table:
+        clauses.append("table_number = ?")
+        params.append(table)
+    if customer:
+        clauses.append("customer_name LIKE ?")
+        params.append(customer + "%")
+    return clauses, params
+
+
+# One keyset page of bills, newest first. Pass the last id of the previous
+# page as before_id to get the next one; no OFFSET scans.
+def fetch_bills(before_id=None, limit=RECORD_PAGE_SIZE, path=DB_FILE, **filters):
+    clauses, params = bill_filters(**filters)
+    if before_id is not None:
+        clauses.append("id < ?")
+        params.append(before_id)
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+    with db.connection(path) as conn:
+        return conn.execute(f"SELECT {BILL_COLUMNS} FROM bills {where} ORDER BY id DESC LIMIT ?",
+                            params + [limit]).fetchall()
+
+
+# Streams every matching bill page by page, holding one page at a time.
+def iter_bills(page_size=RECORD_PAGE_SIZE, path=DB_FILE, **filters):
+    before_id = None
+    while True:
+        rows = fetch_bills(before_id, page_size, path, **filters)
+        yield from rows
+        if len(rows) < page_size:
+            return
+        before_id = rows[-1][0]
+
+
+def fetch_bill_items(bill_id, path=DB_FILE):
+    with db.connection(path) as conn:
+        return conn.execute("""SELECT item_name, item_quantity, cost_per_item, total_cost
+            FROM bill_items WHERE bill_id = ? ORDER BY id""", (bill_id,)).fetchall()
+
+
+# Saved bill browser. Bills are loaded a page at a time as the list is
+# scrolled, and a bill's line items are only read when its row is expanded.
+class RecordsWindow:
+    def __init__(self, win, path=DB_FILE, tables=()):
+        self.win = win
+        self.path = path
+        self.win.title("Bill Records")
+        self.win.geometry("1200x600")
+        self.win.configure(bg='#f0f0f0')
+
+        self.date_from = StringVar()
+        self.date_to = StringVar()
+        self.table = StringVar()
+        self.customer = StringVar()
+        self.filters = {}
+        self.last_id = None
+        self.exhausted = True
+        self.loaded = 0
+
+        # Filters
+        filter_frame = Frame(self.win, bg='#f0f0f0')
+        filter_frame.pack(fill='x', padx=10, pady=10)
+        Label(filter_frame, text="From (YYYY-MM-DD):", font=('Arial', 11), bg='#f0f0f0').pack(side='left')
+        Entry(filter_frame, textvariable=self.date_from, font=('Arial', 11), width=12).pack(side='left', padx=5)
+        Label(filter_frame, text="To:", font=('Arial', 11), bg='#f0f0f0').pack(side='left')
+        Entry(filter_frame, textvariable=self.date_to, font=('Arial', 11), width=12).pack(side='left', padx=5)
+        Label(filter_frame, text="Table:", font=('Arial', 11), bg='#f0f0f0').pack(side='left')
+        ttk.Combobox(filter_frame, textvariable=self.table, values=[""] + list(tables),
+                     state="readonly", width=10).pack(side='left', padx=5)
+        Label(filter_frame, text="Customer:", font=('Arial', 11), bg='#f0f0f0').pack(side='left')
+        Entry(filter_frame, textvariable=self.customer, font=('Arial', 11), width=18).pack(side='left', padx=5)
+        Button(filter_frame, text="Apply", bg='#158aff', fg='white', command=self.apply_filters).pack(side='left', padx=5)
+        Button(filter_frame, text="Clear", bg='#ff6600', fg='white', command=self.clear_filters).pack(side='left', padx=5)
+        self.status = Label(filter_frame, text="", font=('Arial', 11), bg='#f0f0f0')
+        self.status.pack(side='right')
+
+        # Bills and their items
+        tree_frame = Frame(self.win)
+        tree_frame.pack(fill='both', expand=True, padx=10, pady=(0, 10))
+        columns = ("Bill", "Table", "Customer", "Contact", "Date", "Item", "Qty", "Rate", "Total")
+        self.tree = ttk.Treeview(tree_frame, columns=columns, show="headings tree")
+        self.tree.column("#0", width=30, stretch=False)
+        for c in columns:
+            self.tree.heading(c, text=c)
+            self.tree.column(c, width=110, anchor="center")
+        self.scroll = ttk.Scrollbar(tree_frame, orient='vertical', command=self.tree.yview)
+        self.scroll.pack(side='right', fill='y')
+        self.tree.configure(yscrollcommand=self.on_scroll)
+        self.tree.pack(fill='both', expand=True)
+        self.tree.bind("<<TreeviewOpen>>", self.on_open)
+
+        self.apply_filters()
+
+    def apply_filters(self):
+        date_from, date_to = self.date_from.get().strip(), self.date_to.get().strip()
+        if date_from and date_to and date_from > date_to:
+            messagebox.showerror("Error", "From date must be before To date!", parent=self.win)
+            return
+        self.filters = {
+            'date_from': date_from,
+            'date_to': date_to,
+            'table': self.table.get(),
+            'customer': self.customer.get().strip(),
+        }
+        self.tree.delete(*self.tree.get_children())
+        self.last_id = None
+        self.exhausted = False
+        self.loaded = 0
+        self.load_more()
+
+    def clear_filters(self):
+        for var in (self.date_from, self.date_to, self.table, self.customer):
+            var.set("")
+        self.apply_filters()
+
+    def load_more(self):
+        if self.exhausted:
+            return
+        rows = fetch_bills(self.last_id, RECORD_PAGE_SIZE, self.path, **self.filters)
+        for bill_id, bill_no, table, name, contact, date, total in rows:
+            iid = self.tree.insert("", END, iid=str(bill_id), values=(
+                bill_no, table, name, contact, date, "", "", "", f"{total or 0:.2f}"))
+            # Placeholder child so the row can be expanded before items are read
+            self.tree.insert(iid, END, iid=f"{iid}-pending", values=("",) * 5 + ("Loading...",))
+        if rows:
+            self.last_id = rows[-1][0]
+        self.exhausted = len(rows) < RECORD_PAGE_SIZE
+        self.loaded += len(rows)
+        self.status.config(text=f"Showing {self.loaded} bills" + ("" if self.exhausted else " (scroll for more)"))
+
+    def on_scroll(self, first, last):
+        self.scroll.set(first, last)
+        if float(last) >= 0.9:
+            self.load_more()
+
+    def on_open(self, event):
+        iid = self.tree.focus()
+        pending = f"{iid}-pending"
+        if not self.tree.exists(pending):
+            return
+        self.tree.delete(pending)
+        for name, qty, cost, total in fetch_bill_items(int(iid), self.path):
+            self.tree.insert(iid, END, values=(
+                "", "", "", "", "", name, qty, f"{cost:.2f}", f"{total:.2f}"))
@@ -0,0 +1,156 @@
+import calendar
+import sys
+from datetime import date, timedelta
+
+import db
+import migrations
+from availability import parse_date
+from db import DB_FILE
+
+# Closed days come from the daily_* rollup tables; days still marked in
+# rollup_dirty (today, or days with late edits) are aggregated live from
+# bills. Both halves are index range scans on date.
+DAILY_REVENUE_SQL = """
+    SELECT date, table_number, bills, revenue FROM daily_revenue
+    WHERE date BETWEEN :start AND :end AND date NOT IN (SELECT date FROM rollup_dirty)
+    UNION ALL
+    SELECT date, table_number, COUNT(*), SUM(total_cost) FROM bills
+    WHERE date BETWEEN :start AND :end AND date IN (SELECT date FROM rollup_dirty)
+    GROUP BY date, table_number
+    ORDER BY 1, 2
+"""
+
+# Items are grouped by menu item id and shown under their menu name; line
+# items without one fall back to their own text.
+TOP_ITEMS_SQL = """
+    SELECT COALESCE(m.name, s.item_name), SUM(s.quantity), SUM(s.revenue) FROM (
+        SELECT menu_item_id, item_name, quantity, revenue FROM daily_item_sales
+        WHERE date BETWEEN :start AND :end AND date NOT IN (SELECT date FROM rollup_dirty)
+        UNION ALL
+        SELECT i.menu_item_id, i.item_name, i.item_quantity, i.total_cost FROM bills b
+        JOIN bill_items i ON i.bill_id = b.id
+        WHERE b.date BETWEEN :start AND :end AND b.date IN (SELECT date FROM rollup_dirty)
+    ) s
+    LEFT JOIN menu_items m ON m.id = s.menu_item_id
+    GROUP BY COALESCE(s.menu_item_id, s.item_name)
+    ORDER BY 3 DESC
+    LIMIT :limit
+"""
+
+# Room-nights inside [start, stop) summed over every overlapping stay.
+# `stays` covers current bookings and those moved to stay_history.
+OCCUPIED_NIGHTS_SQL = """
+    SELECT SUM(MAX(0, julianday(MIN(checkout_date, :stop)) - julianday(MAX(checkin_date, :start))))
+    FROM stays
+    WHERE checkin_date < :stop AND checkout_date > :start
+"""
+
+AVERAGE_STAY_SQL = """
+    SELECT AVG(julianday(checkout_date) - julianday(checkin_date)), COUNT(*)
+    FROM stays
+    WHERE checkin_date BETWEEN :start AND :end AND julianday(checkout_date) IS NOT NULL
+"""
+
+
+def date_range(date_from, date_to):
+    start, end = parse_date(date_from), parse_date(date_to)
+    if end < start:
+        raise ValueError("From date must be before To date!")
+    return start, end
+
+
+# Moves every closed dirty day (before today) into the rollup tables.
+# Returns how many days were rolled up.
+def refresh_rollups(path=DB_FILE, today=None):
+    today = (today or date.today()).isoformat()
+    with db.transaction(path) as conn:
+        days = [row[0] for row in conn.execute("SELECT date FROM rollup_dirty WHERE date < ?", (today,))]
+        if not days:
+            return 0
+        conn.execute("CREATE TEMP TABLE IF NOT EXISTS rollup_days (date TEXT PRIMARY KEY)")
+        conn.execute("DELETE FROM rollup_days")
+        conn.executemany("INSERT INTO rollup_days VALUES (?)", [(day,) for day in days])
+        conn.execute("DELETE FROM daily_revenue WHERE date IN (SELECT date FROM rollup_days)")
+        conn.execute("DELETE FROM daily_item_sales WHERE date IN (SELECT date FROM rollup_days)")
+        conn.execute("""INSERT INTO daily_revenue (date, table_number, bills, revenue)
+            SELECT date, table_number, COUNT(*), SUM(total_cost) FROM bills
+            WHERE date IN (SELECT date FROM rollup_days)
+            GROUP BY date, table_number""")
+        conn.execute("""INSERT INTO daily_item_sales (date, menu_item_id, item_name, quantity, revenue)
+            SELECT b.date, i.menu_item_id, MIN(i.item_name), SUM(i.item_quantity), SUM(i.total_cost) FROM bills b
+            JOIN bill_items i ON i.bill_id = b.id
+            WHERE b.date IN (SELECT date FROM rollup_days)
+            GROUP BY b.date, COALESCE(i.menu_item_id, i.item_name)""")
+        conn.execute("DELETE FROM rollup_dirty WHERE date IN (SELECT date FROM rollup_days)")
+    return len(days)
+
+
+def daily_revenue(date_from, date_to, path=DB_FILE):
+    start, end = date_range(date_from, date_to)
+    with db.connection(path) as conn:
+        return conn.execute(DAILY_REVENUE_SQL, {'start': start.isoformat(), 'end': end.isoformat()}).fetchall()
+
+
+def top_items(date_from, date_to, limit=10, path=DB_FILE):
+    start, end = date_range(date_from, date_to)
+    with db.connection(path) as conn:
+        return conn.execute(TOP_ITEMS_SQL, {'start': start.isoformat(), 'end': end.isoformat(),
+                                            'limit': limit}).fetchall()
+
+
+# Share of available room-nights that were occupied, from 0.0 to 1.0.
+def occupancy_rate(date_from, date_to, path=DB_FILE):
+    start, end = date_range(date_from, date_to)
+    stop = end + timedelta(days=1)
+    with db.connection(path) as conn:
+        room_count = conn.execute("SELECT COUNT(*) FROM rooms").fetchone()[0]
+        occupied = conn.execute(OCCUPIED_NIGHTS_SQL, {'start': start.isoformat(),
+                                                      'stop': stop.isoformat()}).fetchone()[0]
+    available = room_count * (stop - start).days
+    return (occupied or 0) / available if available else 0.0
+
+
+# (average nights, number of stays) for stays checking in within the range.
+def average_length_of_stay(date_from, date_to, path=DB_FILE):
+    start, end = date_range(date_from, date_to)
+    with db.connection(path) as conn:
+        average, stays = conn.execute(AVERAGE_STAY_SQL, {'start': start.isoformat(),
+                                                         'end': end.isoformat()}).fetchone()
+    return average or 0.0, stays
+
+
+def month_report(year, month, path=DB_FILE):
+    start = date(year, month, 1)
+    end = date(year, month, calendar.monthrange(year, month)[1])
+    refresh_rollups(path)
+    revenue = daily_revenue(start, end, path)
+    average, stays = average_length_of_stay(start, end, path)
+    return {
+        'from': start.isoformat(),
+        'to': end.isoformat(),
+        'revenue': sum(row[3] or 0 for row in revenue),
+        'bills': sum(row[2] for row in revenue),
+        'daily_revenue': revenue,
+        'top_items': top_items(start, end, path=path),
+        'occupancy_rate': occupancy_rate(start, end, path),
+        'average_length_of_stay': average,
+        'stays': stays,
+    }
+
+
+def print_report(report):
+    print(f"Report {report['from']} to {report['to']}")
+    print(f"  Revenue        : {report['revenue']:.2f} from {report['bills']} bills")
+    print(f"  Occupancy rate : {report['occupancy_rate'] * 100:.1f}%")
+    print(f"  Average stay   : {report['average_length_of_stay']:.1f} nights over {report['stays']} stays")
+    print("  Top items:")
+    for name, qty, revenue in report['top_items']:
+        print(f"    {name:<20} {qty:>6} {revenue:>12.2f}")
+
+
+if __name__ == "__main__":
+    # python reports.py YYYY-MM
+    month = sys.argv[1] if len(sys.argv) > 1 else date.today().strftime("%Y-%m")
+    year, month = (int(part) for part in month.split("-"))
+    migrations.migrate(DB_FILE)
+    print_report(month_report(year, month))
@@ -0,0 +1,72 @@
+from collections import namedtuple
+
+import db
+from versioned import VersionedCache
+
+HOUSEKEEPING_STATUSES = ("Clean", "Dirty", "Inspected", "Out of Order")
+
+Room = namedtuple('Room', 'room_no floor room_type rate_plan price_per_day status')
+
+ROOMS_SQL = """
+    SELECT r.room_no, r.floor, t.name, p.name, p.price_per_day, r.status
+    FROM rooms r
+    JOIN room_types t ON t.id = r.room_type_id
+    LEFT JOIN rate_plans p ON p.room_type_id = t.id AND p.is_default = 1
+    ORDER BY r.floor, r.room_no
+"""
+
+
+# In-memory copy of the rooms table. Lookups are dict hits; see
+# versioned.py for when it is reloaded.
+class RoomCatalog(VersionedCache):
+    version_table = 'catalog_version'
+
+    def __contains__(self, room_no):
+        return str(room_no).strip() in self.rooms
+
+    def __iter__(self):
+        return iter(self.room_numbers)
+
+    def __len__(self):
+        return len(self.room_numbers)
+
+    def get(self, room_no):
+        return self.rooms.get(str(room_no).strip())
+
+    def load(self, conn):
+        rows = conn.execute(ROOMS_SQL).fetchall()
+        self.rooms = {row[0]: Room(*row) for row in rows}
+        self.room_numbers = tuple(self.rooms)
+
+    def set_status(self, room_no, status):
+        if status not in HOUSEKEEPING_STATUSES:
+            raise ValueError(f"Unknown housekeeping status: {status}")
+        room_no = str(room_no).strip()
+        if room_no not in self:
+            raise ValueError(f"Invalid room number {room_no}!")
+        with db.transaction(self.path) as conn:
+            conn.execute("UPDATE rooms SET status = ? WHERE room_no = ?", (status, room_no))
+        self.rooms[room_no] = self.rooms[room_no]._replace(status=status)
+        self.invalidate()
+
+    def add_room(self, room_no, floor, room_type, status="Clean"):
+        with db.transaction(self.path) as conn:
+            row = conn.execute("SELECT id FROM room_types WHERE name = ?", (room_type,)).fetchone()
+            if row is None:
+                raise ValueError(f"Unknown room type: {room_type}")
+            conn.execute("INSERT INTO rooms (room_no, floor, room_type_id, status) VALUES (?, ?, ?, ?)",
+                         (str(room_no).strip(), floor, row[0], status))
+        self.invalidate()
+
+    # Creates the room type if needed and makes plan its default rate.
+    def set_rate(self, room_type, price_per_day, plan="Rack"):
+        with db.transaction(self.path) as conn:
+            conn.execute("INSERT OR IGNORE INTO room_types (name) VALUES (?)", (room_type,))
+            type_id = conn.execute("SELECT id FROM room_types WHERE name = ?", (room_type,)).fetchone()[0]
+            conn.execute("UPDATE rate_plans SET is_default = 0 WHERE room_type_id = ?", (type_id,))
+            conn.execute("""INSERT INTO rate_plans (room_type_id, name, price_per_day, is_default)
+                VALUES (?, ?, ?, 1)
+                ON CONFLICT (room_type_id, name) DO UPDATE SET price_per_day = excluded.price_per_day,
+                                                              is_default = 1""",
+                         (type_id, plan, price_per_day))
+        self.invalidate()
@@ -0,0 +1,39 @@
+import re
+
+import db
+from db import DB_FILE
+
+SEARCH_LIMIT = 200
+CATEGORIES = ["ID", "Room No", "Name"]
+
+
+# Turns free text into an FTS5 query where every word is a quoted prefix,
+# so "ram sh" matches "Ram Shrestha".
+def name_query(text):
+    return " ".join(f'"{word}"*' for word in re.findall(r"\w+", text))
+
+
+# ID is a primary-key lookup, Room No uses idx_occupants_room and Name goes
+# through the occupants_fts index. Returns full occupants rows.
+def search_occupants(category, text, path=DB_FILE, limit=SEARCH_LIMIT):
+    text = text.strip()
+    if not text:
+        return []
+
+    with db.connection(path) as conn:
+        if category == "ID":
+            if not text.isdigit():
+                return []
+            return conn.execute("SELECT * FROM occupants WHERE id = ?", (int(text),)).fetchall()
+        if category == "Room No":
+            return conn.execute("SELECT * FROM occupants WHERE room_no = ? ORDER BY id LIMIT ?",
+                                (text, limit)).fetchall()
+        if category == "Name":
+            query = name_query(text)
+            if not query:
+                return []
+            return conn.execute("""SELECT o.* FROM occupants_fts f
+                JOIN occupants o ON o.id = f.rowid
+                WHERE occupants_fts MATCH ?
+                ORDER BY f.rowid LIMIT ?""", (query, limit)).fetchall()
+    raise ValueError(f"Unknown search category: {category}")
@@ -0,0 +1,37 @@
+import threading
+
+import db
+from db import DB_FILE
+
+BLOCK_SIZE = 50
+
+
+# Hands out unique, increasing numbers from a row in the sequences table.
+# Each process reserves a block of numbers in one write and then serves
+# them from memory, so most calls never touch the database. Numbers left
+# in a block when the process exits are skipped, never reused.
+class BlockSequence:
+    def __init__(self, name, path=DB_FILE, block_size=BLOCK_SIZE):
+        self.name = name
+        self.path = path
+        self.block_size = block_size
+        self.lock = threading.Lock()
+        self.next_value = 0
+        self.limit = 0
+
+    def reserve_block(self):
+        with db.transaction(self.path) as conn:
+            row = conn.execute("""UPDATE sequences SET next_value = next_value + ?
+                WHERE name = ? RETURNING next_value""", (self.block_size, self.name)).fetchone()
+        if row is None:
+            raise KeyError(f"Unknown sequence: {self.name}")
+        self.limit = row[0]
+        self.next_value = self.limit - self.block_size
+
+    def next(self):
+        with self.lock:
+            if self.next_value >= self.limit:
+                self.reserve_block()
+            value = self.next_value
+            self.next_value += 1
+            return value
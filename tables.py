@@ -0,0 +1,162 @@
+import sys
+
+import db
+import migrations
+from db import DB_FILE
+
+FRONT_ENDS = ('desktop', 'api')
+
+
+# Which tables exist and which zone each belongs to, in display order.
+class TableLayout:
+    def __init__(self, zones):
+        self.zones = {zone: tuple(str(label) for label in labels) for zone, labels in zones.items()}
+        self.labels = tuple(label for labels in self.zones.values() for label in labels)
+        self.known = frozenset(self.labels)
+
+    def __contains__(self, label):
+        return str(label) in self.known
+
+    def __iter__(self):
+        return iter(self.labels)
+
+    def __len__(self):
+        return len(self.labels)
+
+    @classmethod
+    def numbered(cls, count, zone="Main Hall"):
+        return cls({zone: range(1, count + 1)})
+
+    # The tables served by one front end ('desktop' or 'api'), or all of
+    # them when front_end is None.
+    @classmethod
+    def load(cls, path=DB_FILE, front_end=None):
+        zones = {}
+        with db.connection(path) as conn:
+            for label, zone in conn.execute("""SELECT label, zone FROM dining_tables
+                    WHERE ? IS NULL OR front_end = ? ORDER BY zone, position""", (front_end, front_end)):
+                zones.setdefault(zone, []).append(label)
+        return cls(zones)
+
+
+# One open order for one table. Plain Python, no Tk variables.
+class TableSession:
+    __slots__ = ('table_num', 'bill_no', 'customer_name', 'customer_contact', 'room_no', 'items_list', 'grand_total')
+
+    def __init__(self, table_num, bill_no):
+        self.table_num = table_num
+        self.bill_no = bill_no
+        self.customer_name = ''
+        self.customer_contact = ''
+        self.room_no = ''
+        self.items_list = []
+        self.grand_total = 0.0
+
+    # Detached copy, e.g. to save from another thread while the table keeps
+    # taking orders.
+    def copy(self):
+        data = TableSession(self.table_num, self.bill_no)
+        data.customer_name = self.customer_name
+        data.customer_contact = self.customer_contact
+        data.room_no = self.room_no
+        data.items_list = list(self.items_list)
+        data.grand_total = self.grand_total
+        return data
+
+    def is_idle(self):
+        return not (self.customer_name or self.customer_contact or self.room_no or self.items_list)
+
+
+# Sessions are created the first time a table is used, so idle tables hold
+# no memory and no bill number. Lookup is a single dict hit at any size.
+class TableSessions:
+    def __init__(self, layout, new_bill_no):
+        self.layout = layout
+        self.new_bill_no = new_bill_no
+        self.sessions = {}
+
+    def __contains__(self, label):
+        return label in self.layout
+
+    def __iter__(self):
+        return iter(self.layout)
+
+    def __len__(self):
+        return len(self.layout)
+
+    def get(self, label):
+        label = str(label)
+        data = self.sessions.get(label)
+        if data is None:
+            if label not in self.layout:
+                raise ValueError(f"Unknown table: {label}")
+            data = self.sessions[label] = TableSession(label, self.new_bill_no())
+        return data
+
+    def reset(self, label):
+        self.discard(label)
+        return self.get(label)
+
+    def discard(self, label):
+        self.sessions.pop(str(label), None)
+
+    # Recreates a session with a bill number it was given before, e.g. when
+    # rebuilding orders from the journal.
+    def restore(self, label, bill_no):
+        label = str(label)
+        data = self.sessions[label] = TableSession(label, bill_no)
+        return data
+
+    # Sessions that hold an order or customer details.
+    def active(self):
+        return [data for data in self.sessions.values() if not data.is_idle()]
+
+
+# Adds a table to a zone, after the zone's last table unless a position is
+# given. Running billing windows and API servers pick it up on restart.
+def add_table(label, zone, position=None, front_end='desktop', path=DB_FILE):
+    label, zone = str(label).strip(), str(zone).strip()
+    if not label or not zone:
+        raise ValueError("Table label and zone are required!")
+    if front_end not in FRONT_ENDS:
+        raise ValueError(f"Front end must be one of: {', '.join(FRONT_ENDS)}")
+    with db.transaction(path) as conn:
+        if conn.execute("SELECT 1 FROM dining_tables WHERE label = ?", (label,)).fetchone():
+            raise ValueError(f"Table {label} already exists!")
+        if position is None:
+            position = conn.execute("SELECT COALESCE(MAX(position), 0) + 1 FROM dining_tables WHERE zone = ?",
+                                    (zone,)).fetchone()[0]
+        conn.execute("INSERT INTO dining_tables (label, zone, position, front_end) VALUES (?, ?, ?, ?)",
+                     (label, zone, int(position), front_end))
+
+
+# Hands a table to the other front end. Its open order, if any, stays in
+# the old front end's journal and is dropped there, so save or reset it
+# first. The billing window needs at least one table, so its last one
+# cannot be handed over.
+def assign(label, front_end, path=DB_FILE):
+    if front_end not in FRONT_ENDS:
+        raise ValueError(f"Front end must be one of: {', '.join(FRONT_ENDS)}")
+    with db.transaction(path) as conn:
+        if front_end != 'desktop' and not conn.execute(
+                "SELECT 1 FROM dining_tables WHERE front_end = 'desktop' AND label != ? LIMIT 1",
+                (str(label),)).fetchone():
+            raise ValueError("The billing window must keep at least one table!")
+        if not conn.execute("UPDATE dining_tables SET front_end = ? WHERE label = ?",
+                            (front_end, str(label))).rowcount:
+            raise ValueError(f"Unknown table: {label}")
+
+
+if __name__ == "__main__":
+    # python tables.py                              list tables and their front end
+    # python tables.py add LABEL ZONE [desktop|api] add a table at the end of a zone
+    # python tables.py LABEL desktop|api            serve a table from that front end
+    migrations.migrate(DB_FILE)
+    if len(sys.argv) >= 4 and sys.argv[1] == "add":
+        add_table(sys.argv[2], sys.argv[3], front_end=sys.argv[4] if len(sys.argv) > 4 else 'desktop')
+    elif len(sys.argv) >= 3:
+        assign(sys.argv[1], sys.argv[2])
+    with db.connection(DB_FILE) as conn:
+        for label, zone, front_end in conn.execute(
+                "SELECT label, zone, front_end FROM dining_tables ORDER BY zone, position"):
+            print(f"{zone:<15} {label:<8} {front_end}")
@@ -0,0 +1,118 @@
+PAGE_SIZE = 200
+
+
+# Compares two {key: row} snapshots and returns the keys to add, change and remove.
+def diff_rows(old, new):
+    added = [key for key in new if key not in old]
+    changed = [key for key, row in new.items() if key in old and old[key] != row]
+    removed = [key for key in old if key not in new]
+    return added, changed, removed
+
+
+# Keeps a ttk.Treeview in step with a keyed list of rows. Each row's key is
+# its Treeview iid, so only rows that really changed are touched.
+class TreeSync:
+    def __init__(self, tree):
+        self.tree = tree
+        self.rows = {}
+
+    def __contains__(self, key):
+        return str(key) in self.rows
+
+    # rows: (key, values, tags) in display order
+    def sync(self, rows):
+        new = {}
+        order = []
+        for key, values, tags in rows:
+            key = str(key)
+            new[key] = (tuple(values), tuple(tags))
+            order.append(key)
+
+        added, changed, removed = diff_rows(self.rows, new)
+        if removed:
+            self.tree.delete(*removed)
+        for key in changed:
+            values, tags = new[key]
+            self.tree.item(key, values=values, tags=tags)
+        if added:
+            added = set(added)
+            for index, key in enumerate(order):
+                if key in added:
+                    values, tags = new[key]
+                    self.tree.insert("", index, iid=key, values=values, tags=tags)
+        self.rows = new
+
+    def upsert(self, key, values, tags=()):
+        key = str(key)
+        entry = (tuple(values), tuple(tags))
+        if key not in self.rows:
+            self.tree.insert("", "end", iid=key, values=entry[0], tags=entry[1])
+        elif self.rows[key] != entry:
+            self.tree.item(key, values=entry[0], tags=entry[1])
+        self.rows[key] = entry
+
+    def remove(self, key):
+        key = str(key)
+        if self.rows.pop(key, None) is not None:
+            self.tree.delete(key)
+
+
+# TreeSync over a table too large to show at once. Rows are fetched in
+# keyset pages (fetch_page(after_key, limit), ordered by key) and the next
+# page is loaded when the view is scrolled near the bottom.
+class PagedTreeSync(TreeSync):
+    def __init__(self, tree, fetch_page, page_size=PAGE_SIZE, scrollbar=None):
+        super().__init__(tree)
+        self.fetch_page = fetch_page
+        self.page_size = page_size
+        self.scrollbar = scrollbar
+        self.last_key = None
+        self.exhausted = False
+        self.filtered = False
+        tree.configure(yscrollcommand=self.on_scroll)
+
+    def track(self, rows):
+        if rows:
+            self.last_key = rows[-1][0]
+        self.exhausted = len(rows) < self.page_size
+
+    def reload(self):
+        self.filtered = False
+        rows = self.fetch_page(None, self.page_size)
+        self.sync(rows)
+        self.track(rows)
+
+    # Swaps the pages for a fixed result set, e.g. search hits, until the
+    # next reload().
+    def show(self, rows):
+        self.filtered = True
+        self.sync(rows)
+
+    def load_more(self):
+        if self.exhausted or self.filtered:
+            return
+        rows = self.fetch_page(self.last_key, self.page_size)
+        for key, values, tags in rows:
+            super().upsert(key, values, tags)
+        self.track(rows)
+
+    # Whether a row with this key belongs in the pages loaded so far.
+    def covers(self, key):
+        return self.exhausted or (self.last_key is not None and key <= self.last_key)
+
+    def upsert(self, key, values, tags=()):
+        if self.filtered:
+            if key in self:
+                super().upsert(key, values, tags)
+            return
+        if not self.covers(key):
+            return
+        super().upsert(key, values, tags)
+        if self.last_key is None or key > self.last_key:
+            self.last_key = key
+
+    def on_scroll(self, first, last):
+        if self.scrollbar is not None:
+            self.scrollbar.set(first, last)
+        if float(last) >= 0.9:
+            self.load_more()
@@ -0,0 +1,40 @@
+import db
+from db import DB_FILE
+
+
+# In-memory copy of some tables, reloaded only when the single row of
+# version_table (bumped by triggers on those tables) shows they changed.
+# Subclasses set version_table and fill themselves in load(conn).
+class VersionedCache:
+    version_table = None
+
+    def __init__(self, path=DB_FILE):
+        self.path = path
+        self.version = None
+        self.refresh()
+
+    def read_version(self, conn):
+        return conn.execute(f"SELECT version FROM {self.version_table} WHERE id = 1").fetchone()[0]
+
+    def current_version(self):
+        with db.connection(self.path) as conn:
+            return self.read_version(conn)
+
+    def refresh(self):
+        with db.connection(self.path) as conn:
+            self.version = self.read_version(conn)
+            self.load(conn)
+
+    def load(self, conn):
+        raise NotImplementedError
+
+    def invalidate(self):
+        self.version = None
+
+    # Reloads if this or another process changed the tables. Returns
+    # whether anything was reloaded.
+    def ensure_fresh(self):
+        if self.version is not None and self.version == self.current_version():
+            return False
+        self.refresh()
+        return True
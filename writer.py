@@ -0,0 +1,120 @@
+import queue
+import threading
+
+POLL_MS = 15
+MAX_BATCH = 100
+
+
+class Job:
+    __slots__ = ('fn', 'args', 'on_done', 'on_error', 'batch', 'result', 'error')
+
+    def __init__(self, fn, args, on_done, on_error, batch):
+        self.fn = fn
+        self.args = args
+        self.on_done = on_done
+        self.on_error = on_error
+        self.batch = batch
+        self.result = None
+        self.error = None
+
+
+# Runs database writes on one background thread so the Tk mainloop never
+# waits on disk or on another process's lock. Jobs queued back to back
+# with the same batch function are handed to it together (e.g. several
+# bills saved in one transaction). Results come back on the Tk thread:
+# a short after() poll runs while jobs are pending and calls on_done or
+# on_error there, since Tk must only be touched from its own thread.
+class BackgroundWriter:
+    def __init__(self, widget, poll_ms=POLL_MS, name="writer"):
+        self.widget = widget
+        self.poll_ms = poll_ms
+        self.jobs = queue.Queue()
+        self.done = queue.Queue()
+        self.pending = 0
+        self.polling = False
+        self.closed = False
+        self.thread = threading.Thread(target=self.run, name=name, daemon=True)
+        self.thread.start()
+
+    # fn(*args) runs on the writer thread. With batch set, consecutive jobs
+    # sharing it are combined into one call batch([args, ...]) that returns
+    # one result per job, and fn is not used. An exception returned as a
+    # job's result fails only that job; one raised fails the whole group.
+    def submit(self, fn, args=(), on_done=None, on_error=None, batch=None):
+        self.jobs.put(Job(fn, args, on_done, on_error, batch))
+        self.pending += 1
+        if not self.polling:
+            self.polling = True
+            self.widget.after(self.poll_ms, self.poll)
+
+    def run(self):
+        while True:
+            job = self.jobs.get()
+            if job is None:
+                return
+            jobs = [job]
+            while len(jobs) < MAX_BATCH:
+                try:
+                    job = self.jobs.get_nowait()
+                except queue.Empty:
+                    break
+                if job is None:
+                    self.jobs.put(None)
+                    break
+                jobs.append(job)
+            for group in self.group(jobs):
+                self.execute(group)
+
+    # Splits jobs into runs of consecutive jobs with the same batch function.
+    def group(self, jobs):
+        group = [jobs[0]]
+        for job in jobs[1:]:
+            if job.batch is not None and job.batch is group[-1].batch:
+                group.append(job)
+            else:
+                yield group
+                group = [job]
+        yield group
+
+    def execute(self, group):
+        try:
+            if group[0].batch is not None:
+                results = group[0].batch([job.args for job in group])
+                for job, result in zip(group, results):
+                    if isinstance(result, Exception):
+                        job.error = result
+                    else:
+                        job.result = result
+            else:
+                group[0].result = group[0].fn(*group[0].args)
+        except Exception as e:
+            for job in group:
+                job.error = e
+        for job in group:
+            self.done.put(job)
+
+    def poll(self):
+        if self.closed:
+            return
+        while True:
+            try:
+                job = self.done.get_nowait()
+            except queue.Empty:
+                break
+            self.pending -= 1
+            if job.error is not None:
+                if job.on_error:
+                    job.on_error(job.error)
+            elif job.on_done:
+                job.on_done(job.result)
+        if self.pending:
+            self.widget.after(self.poll_ms, self.poll)
+        else:
+            self.polling = False
+
+    # Finishes every queued write, then stops the thread. Callbacks for jobs
+    # that complete after this are not run.
+    def close(self):
+        self.closed = True
+        self.jobs.put(None)
+        self.thread.join()